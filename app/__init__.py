@@ -1,42 +1,129 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from flask_socketio import SocketIO
 from config import Config
 
 db = SQLAlchemy()
 login_manager = LoginManager()
-socketio = SocketIO(async_mode="threading")
-migrate = Migrate()
+socketio = SocketIO()
+
+def init_socketio(app):
+    """Branche Socket.IO sur la file de messages éventuelle (mode multi-workers)"""
+    async_mode = app.config["SOCKETIO_ASYNC_MODE"]
+    queue_url = app.config["SOCKETIO_MESSAGE_QUEUE"]
+    previous = socketio.server
+    if queue_url and queue_url.startswith("local://"):
+        from app.broker import LocalSocketManager
+        socketio.init_app(app, async_mode=async_mode, client_manager=LocalSocketManager(queue_url))
+    else:
+        socketio.init_app(app, async_mode=async_mode, message_queue=queue_url)
+    if previous is not None:
+        # Les @socketio.on sont posés sur le premier serveur créé : create_app()
+        # appelée une seconde fois (workers, CLI) doit les reprendre
+        socketio.server.handlers = previous.handlers
+
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # 🗄️ Profil de la base : pool mesuré, réglages SQLite ou pool PostgreSQL
+    from app.database import engine_options, init_engine
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **engine_options(app),
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
+
+    # 🌿 En mode eventlet / gevent, l’accès à la base ne doit pas bloquer la boucle
+    if app.config["SOCKETIO_ASYNC_MODE"] in ("eventlet", "gevent"):
+        from app.green import cooperative_engine_options
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+            **cooperative_engine_options(app),
+        }
+
     db.init_app(app)
+    with app.app_context():
+        init_engine(app, db.engine)
     login_manager.init_app(app)
-    migrate.init_app(app, db)
-    socketio.init_app(app)
+    init_socketio(app)
 
     login_manager.login_view = "auth.login"
 
+    # ⏱️ Durées, requêtes SQL et tailles par route / événement (avant les blueprints)
+    from app.instrumentation import instrumentation
+    instrumentation.init_app(app)
+
+    # 🗜️ Compression HTTP (après l’instrumentation : tailles mesurées compressées)
+    from app.compression import compression
+    compression.init_app(app)
+
+    from app.identity import identities
+    identities.init_app(app)
+
+    from app.wire import wire_formats
+    wire_formats.init_app(app)
+
+    # 🔐 Hachage des mots de passe (pool de processus) et limites de connexion
+    from app.passwords import HasherBusy, login_throttle, password_hasher
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
+
+    @app.errorhandler(HasherBusy)
+    def hasher_busy(exc):
+        return "⏳ Serveur très sollicité, réessayez dans quelques secondes.", 503, {"Retry-After": "5"}
+
+    from app.writer import message_writer
+    message_writer.init_app(app)
+
+    from app.sequences import room_sequences
+    room_sequences.init_app(app)
+
+    from app.presence import presence
+    presence.init_app(app)
+
+    from app.previews import previews
+    previews.init_app(app)
+
+    from app.recent import recent_messages
+    recent_messages.init_app(app)
+
     # Enregistrement des blueprints
     from app.routes.auth import auth_bp
     from app.routes.chat import chat_bp
     from app.routes.main import main_bp
     from app.routes.admin import admin_bp
+    from app.routes.files import files_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(chat_bp)
     app.register_blueprint(main_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(files_bp)
 
     # Import des sockets (pour le chat en temps réel)
     from app import sockets
 
-    # Création des tables (si pas encore existantes)
-    with app.app_context():
-        db.create_all()
+    # Commandes CLI (flask stats ..., blobs ..., search ..., users ..., export ..., retention ..., assets ...)
+    from app.stats import stats_cli
+    from app.blobs import blobs_cli
+    from app.search import search_cli
+    from app.user_import import users_cli
+    from app.export import export_cli
+    from app.retention import retention_cli
+    from app.compression import assets_cli
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(blobs_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(users_cli)
+    app.cli.add_command(export_cli)
+    app.cli.add_command(retention_cli)
+    app.cli.add_command(assets_cli)
+
+    # 🧱 Schéma : flask init-db, flask db ... (Flask-Migrate chargé à la demande)
+    from app.schema import MigrationsGroup, init_db_command
+    app.cli.add_command(MigrationsGroup("db", help="Migrations de la base (Flask-Migrate / Alembic)."))
+    app.cli.add_command(init_db_command)
 
     return app  # ✅ bien aligné, sans indentations en trop
@@ -0,0 +1,251 @@
+import hashlib
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, bindparam, event, func, select
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.models import Blob, Message, MessageArchive
+from app.stats import _dialect_insert
+
+logger = logging.getLogger(__name__)
+
+blobs_cli = AppGroup("blobs", help="Stockage des fichiers par empreinte.")
+
+BLOCK_SIZE = 1024 * 1024
+
+
+# ======================================================
+# 🗄️ Rangement par empreinte SHA-256
+# ======================================================
+# uploads/ab/cd/<sha256>.<ext> : deux niveaux de 256 dossiers, aucun
+# répertoire ne grossit au-delà de quelques milliers d’entrées.
+def blob_path(digest, ext):
+    """Chemin d’un blob relatif à /static/ (valeur de Message.file_path)"""
+    return f"uploads/{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+
+
+def disk_path(file_path):
+    """Emplacement sur disque d’un Message.file_path ('uploads/...')"""
+    return os.path.join(current_app.config["UPLOAD_FOLDER"], *file_path.split("/")[1:])
+
+
+def preview_path(file_path):
+    """Aperçu réduit d’un fichier (app.previews) : uploads/previews/<chemin>.jpg"""
+    return f"uploads/previews/{file_path.split('/', 1)[1]}.jpg"
+
+
+def _touch(path, digest, size):
+    """Crée la ligne du blob (ou rafraîchit last_used) dans la transaction courante.
+
+    La ligne est verrouillée avant de regarder le disque : un ramasse-miettes
+    concurrent ne peut pas effacer le fichier entre la vérification et le commit.
+    """
+    blobs = Blob.__table__
+    now = datetime.utcnow()
+    insert = _dialect_insert(db.session.get_bind().dialect)
+    if insert is not None:
+        stmt = insert(blobs).values(path=path, sha256=digest, size=size, refcount=0, last_used=now)
+        db.session.execute(stmt.on_conflict_do_update(index_elements=[blobs.c.path], set_={"last_used": now}))
+        return
+
+    result = db.session.execute(blobs.update().where(blobs.c.path == path).values(last_used=now))
+    if result.rowcount == 0:
+        db.session.execute(blobs.insert().values(path=path, sha256=digest, size=size, refcount=0, last_used=now))
+
+
+def _store(digest, size, ext, write):
+    """Range un contenu déjà haché ; write(tmp) n’est appelé que s’il n’existe pas encore"""
+    path = blob_path(digest, ext)
+    _touch(path, digest, size)
+    target = disk_path(path)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(tmp)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return path
+
+
+def store_stream(stream, ext):
+    """Hache un flux (fichier reçu par formulaire) et ne l’écrit que si son contenu est nouveau"""
+    hasher, size = hashlib.sha256(), 0
+    for block in iter(lambda: stream.read(BLOCK_SIZE), b""):
+        hasher.update(block)
+        size += len(block)
+
+    def write(tmp):
+        stream.seek(0)
+        with open(tmp, "wb") as f:
+            for block in iter(lambda: stream.read(BLOCK_SIZE), b""):
+                f.write(block)
+
+    return _store(hasher.hexdigest(), size, ext, write)
+
+
+def store_bytes(data, ext):
+    """Variante de store_stream pour un contenu déjà en mémoire"""
+    def write(tmp):
+        with open(tmp, "wb") as f:
+            f.write(data)
+
+    return _store(hashlib.sha256(data).hexdigest(), len(data), ext, write)
+
+
+def store_file(src, digest, ext):
+    """Range un fichier déjà haché pendant sa réception (envoi par morceaux) ; src est consommé"""
+    try:
+        return _store(digest, os.path.getsize(src), ext, lambda tmp: os.replace(src, tmp))
+    finally:
+        if os.path.exists(src):
+            os.remove(src)
+
+
+# ======================================================
+# 🔢 Compteurs de références (Message.file_path → Blob)
+# ======================================================
+def apply_blob_deltas(connection, deltas):
+    """Applique {file_path: delta} ; les chemins sans blob (anciens fichiers) sont ignorés"""
+    rows = [{"p": path, "d": delta} for path, delta in sorted(deltas.items()) if delta]
+    if rows:
+        blobs = Blob.__table__
+        connection.execute(
+            blobs.update().where(blobs.c.path == bindparam("p")).values(refcount=blobs.c.refcount + bindparam("d")),
+            rows,
+        )
+
+
+def _record(target, delta):
+    if target.file_path:
+        pending = object_session(target).info.setdefault("blob_deltas", Counter())
+        pending[target.file_path] += delta
+
+
+# Même principe que app.stats : accumulation par flush, une écriture par blob.
+# Les suppressions en masse (Query.delete) doivent appeler apply_blob_deltas.
+@event.listens_for(Message, "after_insert")
+def _on_message_insert(mapper, connection, target):
+    _record(target, 1)
+
+
+@event.listens_for(Message, "after_delete")
+def _on_message_delete(mapper, connection, target):
+    _record(target, -1)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_pending_deltas(session, flush_context):
+    deltas = session.info.pop("blob_deltas", None)
+    if deltas:
+        apply_blob_deltas(session.connection(), deltas)
+        released = session.info.setdefault("released_blobs", set())
+        released.update(path for path, delta in deltas.items() if delta < 0)
+
+
+@event.listens_for(Session, "after_commit")
+def _collect_released(session):
+    released = session.info.pop("released_blobs", None)
+    if released:
+        try:
+            collect_blobs(released)
+        except Exception:
+            logger.exception("Échec du ramasse-miettes des fichiers")
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_deltas(session):
+    session.info.pop("blob_deltas", None)
+    session.info.pop("released_blobs", None)
+
+
+# ======================================================
+# 🧹 Ramasse-miettes
+# ======================================================
+def collect_blobs(paths=None):
+    """Supprime les blobs sans référence depuis BLOB_GC_GRACE secondes ; renvoie leur nombre.
+
+    Le délai de grâce couvre l’intervalle entre le rangement d’un fichier et
+    l’insertion du message qui le référence.
+    """
+    blobs = Blob.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config["BLOB_GC_GRACE"])
+    condition = and_(blobs.c.refcount <= 0, blobs.c.last_used < cutoff)
+    if paths is not None:
+        condition = and_(condition, blobs.c.path.in_(sorted(paths)))
+
+    with db.engine.begin() as connection:
+        removed = connection.execute(blobs.delete().where(condition).returning(blobs.c.path)).scalars().all()
+        # Fichiers effacés avant le commit : un envoi concurrent du même contenu
+        # attend le verrou de la ligne, puis réécrit le fichier
+        for path in removed:
+            for stale in (path, preview_path(path)):
+                try:
+                    os.remove(disk_path(stale))
+                except FileNotFoundError:
+                    pass
+    return len(removed)
+
+
+def reconcile_refcounts():
+    """Recalcule tous les compteurs de références (messages actifs et archivés)"""
+    blobs = Blob.__table__
+    count = (
+        select(func.count(Message.id))
+        .where(Message.file_path == blobs.c.path)
+        .scalar_subquery()
+    ) + (
+        select(func.count(MessageArchive.id))
+        .where(MessageArchive.file_path == blobs.c.path)
+        .scalar_subquery()
+    )
+    result = db.session.execute(blobs.update().values(refcount=count))
+    db.session.commit()
+    return result.rowcount
+
+
+@blobs_cli.command("gc")
+def gc_command():
+    """Supprime les fichiers qui ne sont plus référencés."""
+    print(f"✔ {collect_blobs()} fichiers supprimés")
+
+
+@blobs_cli.command("reconcile")
+def reconcile_command():
+    """Recalcule les compteurs de références."""
+    print(f"✔ {reconcile_refcounts()} blobs recomptés")
+
+
+@blobs_cli.command("import-legacy")
+def import_legacy_command():
+    """Range par empreinte les fichiers envoyés avant le stockage par contenu."""
+    legacy = (
+        db.session.query(Message.file_path, func.count(Message.id))
+        .outerjoin(Blob, Blob.path == Message.file_path)
+        .filter(Message.file_path.isnot(None), Blob.path.is_(None))
+        .group_by(Message.file_path)
+        .all()
+    )
+    imported = missing = 0
+    for old_path, count in legacy:
+        src = disk_path(old_path)
+        if not os.path.exists(src):
+            missing += 1
+            continue
+        with open(src, "rb") as f:
+            new_path = store_stream(f, old_path.rsplit(".", 1)[-1].lower())
+        # Mise à jour en masse : pas d’événement, le compteur est ajusté à la main
+        Message.query.filter_by(file_path=old_path).update({"file_path": new_path}, synchronize_session=False)
+        apply_blob_deltas(db.session.connection(), {new_path: count})
+        db.session.commit()
+        if new_path != old_path:
+            os.remove(src)
+        imported += 1
+    print(f"✔ {imported} fichiers importés, {missing} introuvables")
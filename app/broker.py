@@ -0,0 +1,154 @@
+import logging
+import socket
+import socketserver
+import struct
+import threading
+from urllib.parse import urlparse
+from socketio import PubSubManager
+
+logger = logging.getLogger(__name__)
+
+# Trame : longueur sur 4 octets (big-endian) puis le message JSON
+_HEADER = struct.Struct("!I")
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("connexion au broker fermée")
+        buf += chunk
+    return bytes(buf)
+
+
+def read_frame(sock):
+    (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return _recv_exact(sock, length)
+
+
+def write_frame(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def parse_url(url):
+    """'local://127.0.0.1:5555' → ('127.0.0.1', 5555)"""
+    parsed = urlparse(url)
+    return parsed.hostname or "127.0.0.1", parsed.port or 5555
+
+
+# ======================================================
+# 📮 Broker local : relaie chaque trame à tous les workers abonnés
+# ======================================================
+class LocalBroker(socketserver.ThreadingTCPServer):
+    """Broker pub/sub minimal, sans service externe, pour N workers sur une machine"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=5555):
+        self.subscribers = set()
+        self.subscribers_lock = threading.Lock()
+        super().__init__((host, port), _BrokerHandler)
+
+    def relay(self, payload):
+        with self.subscribers_lock:
+            subscribers = list(self.subscribers)
+        for sub in subscribers:
+            try:
+                with sub.lock:
+                    write_frame(sub.request, payload)
+            except OSError:
+                self.unsubscribe(sub)
+
+    def unsubscribe(self, sub):
+        with self.subscribers_lock:
+            self.subscribers.discard(sub)
+
+
+class _BrokerHandler(socketserver.BaseRequestHandler):
+    """Première trame = rôle de la connexion : b"pub" (émission) ou b"sub" (abonnement)"""
+
+    def setup(self):
+        self.lock = threading.Lock()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        try:
+            role = read_frame(self.request)
+            if role == b"sub":
+                with self.server.subscribers_lock:
+                    self.server.subscribers.add(self)
+                # Un abonné n’émet rien : on attend simplement la fermeture
+                while self.request.recv(1):
+                    pass
+            else:
+                while True:
+                    self.server.relay(read_frame(self.request))
+        except (ConnectionError, OSError):
+            pass
+
+    def finish(self):
+        self.server.unsubscribe(self)
+
+
+def start_broker(url):
+    """Démarre le broker dans un thread et le renvoie"""
+    broker = LocalBroker(*parse_url(url))
+    threading.Thread(target=broker.serve_forever, name="socketio-broker", daemon=True).start()
+    logger.info("Broker Socket.IO local à l’écoute sur %s", url)
+    return broker
+
+
+# ======================================================
+# 🔌 Client manager python-socketio branché sur le broker local
+# ======================================================
+class LocalSocketManager(PubSubManager):
+    """Partage émissions, salons et déconnexions entre workers via LocalBroker.
+
+    URL : local://hôte:port
+    """
+
+    name = "local"
+
+    def __init__(self, url="local://127.0.0.1:5555", channel="socketio", write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.address = parse_url(url)
+        self._sock = None
+        self._sock_lock = threading.Lock()
+
+    def _connect(self, role):
+        sock = socket.create_connection(self.address)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        write_frame(sock, role)
+        return sock
+
+    def _publish(self, data):
+        payload = self.json.dumps(data).encode()
+        with self._sock_lock:
+            for retry in (False, True):
+                try:
+                    if self._sock is None:
+                        self._sock = self._connect(b"pub")
+                    write_frame(self._sock, payload)
+                    return
+                except OSError:
+                    self._sock = None
+                    if retry:
+                        raise
+
+    def _listen(self):
+        while True:
+            try:
+                sock = self._connect(b"sub")
+            except OSError:
+                self._get_logger().error("Broker injoignable, nouvelle tentative dans 1s")
+                self.server.sleep(1)
+                continue
+            try:
+                while True:
+                    yield read_frame(sock)
+            except (ConnectionError, OSError):
+                self._get_logger().error("Connexion au broker perdue")
+            finally:
+                sock.close()
@@ -0,0 +1,84 @@
+import logging
+import os
+import signal
+import socket
+import sys
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def serve_cluster(create_app, host, port, workers, serve_worker):
+    """Lance `workers` processus serveurs partageant un même socket d’écoute (pré-fork).
+
+    - create_app() construit l’application ; chaque worker appelle la sienne
+      après le fork (aucun thread, green thread ni connexion hérités)
+    - serve_worker(app, sock) sert les requêtes dans un worker et ne rend pas la main
+    - le broker local (file local://...) et la réconciliation des statistiques
+      tournent dans le processus parent
+    - émissions, salons et présence passent par SOCKETIO_MESSAGE_QUEUE
+
+    ⚠️ Repose sur os.fork : POSIX uniquement.
+    """
+    queue_url = Config.SOCKETIO_MESSAGE_QUEUE
+    if not queue_url:
+        raise RuntimeError("WORKERS > 1 nécessite SOCKETIO_MESSAGE_QUEUE (ex. local://127.0.0.1:5555)")
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(1024)
+    listener.set_inheritable(True)
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(create_app, listener, serve_worker)
+        children.append(pid)
+    listener.close()
+    logger.info("%d workers à l’écoute sur %s:%d", workers, host, port)
+
+    from app.presence import presence, worker_id
+    from app.stats import start_reconciler
+    from app.retention import start_retention
+
+    app = create_app()
+    with app.app_context():
+        # Les sessions laissées par des workers précédents sont forcément mortes
+        presence.purge_workers(keep=[worker_id(pid) for pid in children])
+    if queue_url.startswith("local://"):
+        from app.broker import start_broker
+        start_broker(queue_url)
+    start_reconciler(app)
+    start_retention(app)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for pid in children:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+
+
+def _run_worker(create_app, listener, serve_worker):
+    # SIGTERM → sortie propre (atexit : vidage des files, purge de la présence)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        serve_worker(create_app(), listener)
+    finally:
+        sys.exit(0)
@@ -0,0 +1,167 @@
+import gzip
+import importlib
+import importlib.util
+import logging
+import mimetypes
+import os
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+# Types compressibles (HTML, CSS, JS, JSON...) ; images et archives le sont déjà
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/css", "text/plain", "text/csv", "text/javascript",
+    "application/javascript", "application/json", "application/manifest+json",
+    "application/xml", "image/svg+xml",
+}
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".json", ".html", ".svg", ".txt", ".map", ".webmanifest"}
+
+# Variantes précompressées des fichiers statiques, par ordre de préférence
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+# ======================================================
+# 🗜️ Compression HTTP (gzip, brotli si le module est installé)
+# ======================================================
+# - pages et réponses JSON : compressées à la volée au-delà de
+#   HTTP_COMPRESSION_MIN_SIZE octets, selon l’Accept-Encoding du navigateur ;
+# - fichiers statiques : variantes .br / .gz produites une fois pour toutes
+#   (flask assets compress, à l’installation ou au déploiement), servies
+#   telles quelles à la place de l’original quand elles sont à jour.
+# Réponses en flux (exports) et fichiers envoyés par send_file : inchangés.
+class Compression:
+    def __init__(self):
+        self.enabled = False
+        self.min_size = 512
+        self.gzip_level = 6
+        self.brotli_quality = 5
+        self.brotli = None
+
+    def init_app(self, app):
+        self.enabled = app.config["HTTP_COMPRESSION"]
+        self.min_size = app.config["HTTP_COMPRESSION_MIN_SIZE"]
+        self.gzip_level = app.config["HTTP_GZIP_LEVEL"]
+        self.brotli_quality = app.config["HTTP_BROTLI_QUALITY"]
+        if importlib.util.find_spec("brotli"):
+            self.brotli = importlib.import_module("brotli")
+        else:
+            logger.info("Module brotli absent : compression gzip seulement")
+        if not self.enabled:
+            return
+        app.after_request(self._compress)
+        app.view_functions["static"] = self.send_static
+
+    def _accepted(self, encodings):
+        return [name for name in encodings if request.accept_encodings[name]]
+
+    # --- Réponses dynamiques ---
+    def _compress(self, response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        accepted = self._accepted(["br", "gzip"] if self.brotli else ["gzip"])
+        if not accepted:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        if accepted[0] == "br":
+            data = self.brotli.compress(data, quality=self.brotli_quality)
+        else:
+            data = gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+        response.set_data(data)
+        response.headers["Content-Encoding"] = accepted[0]
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)  # même ressource, autre suite d’octets
+        return response
+
+    # --- Fichiers statiques ---
+    def send_static(self, filename, max_age=None):
+        """Fichier statique, ou sa variante .br / .gz à jour si le navigateur l’accepte"""
+        folder = current_app.static_folder
+        if max_age is None:
+            max_age = current_app.get_send_file_max_age(filename)
+        original = safe_join(folder, filename)
+        if original and os.path.isfile(original):
+            for encoding in self._accepted([encoding for encoding, _ in PRECOMPRESSED]):
+                suffix = dict(PRECOMPRESSED)[encoding]
+                variant = original + suffix
+                if os.path.isfile(variant) and os.path.getmtime(variant) >= os.path.getmtime(original):
+                    response = send_from_directory(
+                        folder, filename + suffix, max_age=max_age,
+                        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+                    )
+                    response.headers["Content-Encoding"] = encoding
+                    response.vary.add("Accept-Encoding")
+                    return response
+        response = send_from_directory(folder, filename, max_age=max_age)
+        if os.path.splitext(filename)[1] in COMPRESSIBLE_EXTENSIONS:
+            response.vary.add("Accept-Encoding")
+        return response
+
+    def precompress(self, folder, exclude=()):
+        """Écrit les variantes .gz (et .br) des fichiers compressibles de `folder`.
+
+        Retourne [(chemin relatif, taille, taille gzip, taille brotli ou None)] ;
+        une variante qui ne gagne rien n’est pas gardée.
+        """
+        exclude = {os.path.abspath(path) for path in exclude}
+        written = []
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [name for name in dirs if os.path.abspath(os.path.join(root, name)) not in exclude]
+            for name in sorted(files):
+                if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS:
+                    continue
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    data = f.read()
+                sizes = [_write_variant(path + ".gz", data, gzip.compress(data, compresslevel=9, mtime=0))]
+                if self.brotli:
+                    sizes.append(_write_variant(path + ".br", data, self.brotli.compress(data, quality=11)))
+                else:
+                    sizes.append(None)
+                written.append((os.path.relpath(path, folder), len(data), *sizes))
+        return written
+
+
+def _write_variant(path, original, compressed):
+    """Écrit (atomiquement) la variante si elle est plus petite, sinon retire l’ancienne"""
+    if len(compressed) >= len(original):
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp, path)
+    return len(compressed)
+
+
+compression = Compression()
+
+
+# ======================================================
+# 🛠️ Commande CLI : flask assets compress
+# ======================================================
+assets_cli = AppGroup("assets", help="Fichiers statiques (variantes précompressées).")
+
+
+@assets_cli.command("compress")
+def compress_command():
+    """Précompresse les fichiers statiques (.gz, .br si brotli est installé)."""
+    app = current_app
+    written = compression.precompress(app.static_folder, exclude=[app.config["UPLOAD_FOLDER"]])
+    for path, size, gz, br in written:
+        click.echo(f"{path:<32}{size:>9} o   gzip {gz or '-':>8}   br {br or '-':>8}")
+    click.echo(f"✔ {len(written)} fichier(s) traité(s)")
@@ -0,0 +1,84 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+from app.metrics import metrics
+from app.presence import worker_id
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool qui mesure l’attente d’une connexion libre (pool saturé)"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            metrics.inc("db_pool_timeouts_total", worker=worker_id())
+            raise
+        finally:
+            metrics.observe("db_pool_checkout_wait_seconds", time.perf_counter() - started, worker=worker_id())
+
+
+# ======================================================
+# 🗄️ Profil du moteur de base de données
+# ======================================================
+# SQLite : journal WAL (les lecteurs ne bloquent plus l’écrivain ni l’inverse),
+# synchronous=NORMAL (fsync au checkpoint, sûr en WAL), fichier projeté en
+# mémoire, cache de pages par connexion et attente bornée d’un verrou
+# (busy_timeout) au lieu d’un « database is locked » immédiat.
+#
+# Base serveur (PostgreSQL...) : taille du pool, débordement, vérification
+# des connexions avant usage (pre-ping) et renouvellement périodique (recycle).
+# Dans les deux cas, l’attente d’une connexion libre est mesurée
+# (db_pool_checkout_wait_seconds sur /metrics).
+def engine_options(app):
+    """Options de create_engine() du profil, selon le type de base"""
+    config = app.config
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite":
+        if (url.database or ":memory:") == ":memory:":
+            return {}  # base en mémoire : une seule connexion partagée (StaticPool)
+        return {
+            "poolclass": TimedQueuePool,
+            "pool_size": config["DB_POOL_SIZE"],
+            "max_overflow": config["DB_MAX_OVERFLOW"],
+            "pool_timeout": config["DB_POOL_TIMEOUT"],
+        }
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+    }
+
+
+def sqlite_pragmas(config):
+    """PRAGMA appliqués à chaque nouvelle connexion SQLite (valeur vide = défaut du pilote)"""
+    pragmas = {
+        "journal_mode": config["SQLITE_JOURNAL_MODE"],
+        "synchronous": config["SQLITE_SYNCHRONOUS"],
+        "mmap_size": config["SQLITE_MMAP_SIZE"],
+        "cache_size": -config["SQLITE_CACHE_SIZE_KB"] if config["SQLITE_CACHE_SIZE_KB"] else None,
+        "busy_timeout": config["SQLITE_BUSY_TIMEOUT_MS"],
+    }
+    return {name: value for name, value in pragmas.items() if value not in (None, "")}
+
+
+def init_engine(app, engine):
+    """Branche le profil sur le moteur créé par Flask-SQLAlchemy"""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(app.config)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select
+from app import db
+from app.blobs import disk_path
+from app.models import Message, Room, User
+
+export_cli = AppGroup("export", help="Export de l’historique des messages.")
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "zip": ("application/zip", "zip"),
+}
+
+COLUMNS = ["id", "room_id", "room", "seq", "user", "timestamp", "content", "file_path"]
+
+COPY_BLOCK = 1024 * 1024
+
+
+# ======================================================
+# 📤 Export en flux (NDJSON, CSV, ZIP avec pièces jointes)
+# ======================================================
+# Les messages sont lus par un curseur côté serveur (stream_results), par lots
+# de EXPORT_BATCH_SIZE lignes, et chaque lot est écrit puis oublié : la mémoire
+# reste constante quelle que soit la taille du salon, et la réponse HTTP part
+# en morceaux (Transfer-Encoding: chunked) au fil de la lecture.
+def _message_batches(room_id=None):
+    """Lots de messages (dicts, ordre d’envoi) via un curseur côté serveur"""
+    stmt = (
+        select(
+            Message.id, Message.room_id, Room.name, Message.seq, User.username,
+            Message.timestamp, Message.content, Message.file_path,
+        )
+        .join(Room, Room.id == Message.room_id)
+        .join(User, User.id == Message.user_id)
+        .order_by(Message.id)
+    )
+    if room_id is not None:
+        stmt = stmt.where(Message.room_id == room_id)
+
+    batch_size = current_app.config["EXPORT_BATCH_SIZE"]
+    result = db.session.execute(stmt, execution_options={"stream_results": True, "yield_per": batch_size})
+    try:
+        for rows in result.partitions():
+            yield [
+                dict(zip(COLUMNS, row[:5] + (row[5].isoformat(),) + row[6:]))
+                for row in rows
+            ]
+    finally:
+        result.close()
+
+
+def _file_paths(room_id=None):
+    """Fichiers distincts référencés par les messages exportés"""
+    stmt = select(Message.file_path).where(Message.file_path.isnot(None)).distinct()
+    if room_id is not None:
+        stmt = stmt.where(Message.room_id == room_id)
+    result = db.session.execute(stmt, execution_options={"stream_results": True, "yield_per": 1000})
+    try:
+        yield from result.scalars()
+    finally:
+        result.close()
+
+
+def _ndjson(batch):
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch).encode()
+
+
+def export_ndjson(room_id=None):
+    for batch in _message_batches(room_id):
+        yield _ndjson(batch)
+
+
+def export_csv(room_id=None):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for batch in _message_batches(room_id):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Flux d’écriture non positionnable : zipfile y écrit avec des descripteurs
+    de données (pas de retour en arrière), les octets sont repris morceau par morceau"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def export_zip(room_id=None):
+    """messages.ndjson + pièces jointes sous files/<file_path> (non recompressées)"""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w") as archive:
+        info = zipfile.ZipInfo("messages.ndjson", date_time=datetime.now().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(info, "w", force_zip64=True) as member:
+            for batch in _message_batches(room_id):
+                member.write(_ndjson(batch))
+                yield sink.take()
+
+        for file_path in _file_paths(room_id):
+            path = disk_path(file_path)
+            if not os.path.isfile(path):
+                continue
+            info = zipfile.ZipInfo.from_file(path, arcname=f"files/{file_path}")
+            info.compress_type = zipfile.ZIP_STORED  # images et PDF : déjà compressés
+            with open(path, "rb") as src, archive.open(info, "w", force_zip64=True) as member:
+                while block := src.read(COPY_BLOCK):
+                    member.write(block)
+                    yield sink.take()
+    yield sink.take()
+
+
+EXPORTERS = {"ndjson": export_ndjson, "csv": export_csv, "zip": export_zip}
+
+
+def export_filename(room, fmt):
+    scope = f"salon-{room.id}" if room is not None else "tous-les-salons"
+    return f"export-{scope}-{datetime.utcnow():%Y%m%d-%H%M%S}.{FORMATS[fmt][1]}"
+
+
+@export_cli.command("messages")
+@click.option("--room", "room_id", type=int, help="Id du salon (par défaut : tous les salons).")
+@click.option("--format", "fmt", type=click.Choice(list(FORMATS)), default="ndjson", show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), help="Fichier de sortie (par défaut : nom horodaté, '-' = sortie standard).")
+def export_command(room_id, fmt, output):
+    """Exporte l’historique (sauvegardes planifiées)."""
+    room = None
+    if room_id is not None:
+        room = db.session.get(Room, room_id)
+        if room is None:
+            raise click.ClickException(f"Salon {room_id} introuvable")
+    output = output or export_filename(room, fmt)
+
+    started = time.perf_counter()
+    size = 0
+    out = sys.stdout.buffer if output == "-" else open(output, "wb")
+    try:
+        for chunk in EXPORTERS[fmt](room_id):
+            out.write(chunk)
+            size += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    if output != "-":
+        print(f"✔ {output} : {size / 1e6:.1f} Mo en {time.perf_counter() - started:.1f}s")
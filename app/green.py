@@ -0,0 +1,90 @@
+import logging
+import os
+import sqlite3
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadPoolProxy:
+    """Enveloppe un objet du pilote : chaque appel de méthode s’exécute via run(fn, args, kwargs).
+
+    Les objets renvoyés dont le type figure dans `autowrap` (curseurs) sont
+    enveloppés à leur tour ; les attributs simples sont lus directement.
+    """
+
+    def __init__(self, obj, run, autowrap=()):
+        self._obj = obj
+        self._run = run
+        self._autowrap = autowrap
+
+    def _wrap(self, value):
+        if isinstance(value, self._autowrap):
+            return ThreadPoolProxy(value, self._run, self._autowrap)
+        return value
+
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self._wrap(self._run(attr, args, kwargs))
+        return call
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._obj, name, value)
+
+    def __iter__(self):
+        return iter(self._run(list, (self._obj,), {}))
+
+
+def _thread_runner(async_mode):
+    """Fonction qui exécute un appel bloquant dans le pool de threads natifs de la boucle"""
+    if async_mode == "eventlet":
+        from eventlet import tpool
+        return lambda fn, args, kwargs: tpool.execute(fn, *args, **kwargs)
+    if async_mode == "gevent":
+        import gevent
+        return lambda fn, args, kwargs: gevent.get_hub().threadpool.apply(fn, args, kwargs)
+    raise ValueError(f"mode asynchrone inconnu : {async_mode}")
+
+
+def cooperative_engine_options(app):
+    """Options SQLAlchemy qui empêchent la base de bloquer la boucle eventlet / gevent.
+
+    - SQLite : chaque appel au pilote s’exécute dans le pool de threads natifs
+      de la boucle (eventlet.tpool ou le threadpool du hub gevent).
+    - PostgreSQL : psycopg2 est rendu coopératif par psycogreen s’il est installé.
+    """
+    async_mode = app.config["SOCKETIO_ASYNC_MODE"]
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        run = _thread_runner(async_mode)
+        path = url.database or ":memory:"
+        if path != ":memory:" and not os.path.isabs(path):
+            path = os.path.join(app.instance_path, path)
+
+        def creator():
+            conn = run(sqlite3.connect, (path,), {"check_same_thread": False})
+            return ThreadPoolProxy(conn, run, autowrap=(sqlite3.Cursor,))
+
+        return {"creator": creator}
+
+    if backend == "postgresql":
+        try:
+            if async_mode == "gevent":
+                from psycogreen.gevent import patch_psycopg
+            else:
+                from psycogreen.eventlet import patch_psycopg
+        except ImportError:
+            logger.warning("psycogreen absent : les requêtes PostgreSQL bloqueront la boucle %s", async_mode)
+        else:
+            patch_psycopg()
+
+    return {}
@@ -0,0 +1,109 @@
+from collections import namedtuple
+from flask_login import UserMixin
+from sqlalchemy import select
+from app import db
+from app.cache import TTLCache
+from app.metrics import metrics
+from app.models import Room, User
+from app.presence import worker_id
+
+RoomInfo = namedtuple("RoomInfo", ["id", "name"])
+
+
+class UserIdentity(UserMixin):
+    """Instantané d’un compte, sans objet ORM : current_user des routes et des sockets.
+
+    Pour modifier le compte (mot de passe...), relire le User en base.
+    """
+
+    def __init__(self, id, username, role, active):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.active = active
+
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+    def is_moderator(self) -> bool:
+        return self.role == "moderator"
+
+    def has_role(self, *roles) -> bool:
+        return self.role in roles
+
+    def is_active_member(self) -> bool:
+        return self.active and self.role in {"admin", "moderator", "member"}
+
+    def __repr__(self):
+        return f"<UserIdentity {self.username}>"
+
+
+# ======================================================
+# 🪪 Comptes et salons en cache (user_loader, handlers Socket.IO)
+# ======================================================
+# Un message de chat en régime établi ne lit plus ni l’utilisateur ni le salon :
+# la connexion Socket.IO retient l’id du compte à "connect", les instantanés
+# viennent d’un cache LRU/TTL par processus. Les routes d’administration qui
+# modifient un compte ou un salon l’invalident ; les autres workers le relisent
+# au plus tard après IDENTITY_CACHE_TTL secondes.
+class IdentityCache:
+    def __init__(self):
+        self.users = TTLCache(maxsize=0)
+        self.rooms = TTLCache(maxsize=0)
+        self._connections = {}
+
+    def init_app(self, app):
+        size, ttl = app.config["IDENTITY_CACHE_SIZE"], app.config["IDENTITY_CACHE_TTL"] or None
+        self.users = TTLCache(maxsize=size, ttl=ttl)
+        self.rooms = TTLCache(maxsize=size, ttl=ttl)
+        self._connections.clear()
+
+    def _count(self, kind, hit):
+        metrics.inc(f"identity_cache_{'hits' if hit else 'misses'}_total", kind=kind, worker=worker_id())
+
+    def user(self, user_id):
+        """UserIdentity du compte, ou None s’il n’existe pas (les absents ne sont pas mis en cache)"""
+        identity = self.users.get(user_id)
+        self._count("user", identity is not None)
+        if identity is None:
+            row = db.session.execute(
+                select(User.id, User.username, User.role, User.active).where(User.id == user_id)
+            ).first()
+            if row is None:
+                return None
+            identity = UserIdentity(*row)
+            self.users.set(user_id, identity)
+        return identity
+
+    def room(self, room_id):
+        """RoomInfo du salon, ou None s’il n’existe pas"""
+        info = self.rooms.get(room_id)
+        self._count("room", info is not None)
+        if info is None:
+            row = db.session.execute(select(Room.id, Room.name).where(Room.id == room_id)).first()
+            if row is None:
+                return None
+            info = RoomInfo(*row)
+            self.rooms.set(room_id, info)
+        return info
+
+    def invalidate_user(self, user_id):
+        self.users.pop(user_id)
+
+    def invalidate_room(self, room_id):
+        self.rooms.pop(room_id)
+
+    # --- Connexions Socket.IO ---
+    def connect(self, sid, user_id):
+        self._connections[sid] = user_id
+
+    def disconnect(self, sid):
+        self._connections.pop(sid, None)
+
+    def for_sid(self, sid):
+        """Compte de la connexion `sid`, ou None si elle n’est pas authentifiée"""
+        user_id = self._connections.get(sid)
+        return self.user(user_id) if user_id is not None else None
+
+
+identities = IdentityCache()
@@ -0,0 +1,166 @@
+import functools
+import json
+import logging
+import time
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.metrics import metrics
+from app.presence import worker_id
+
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+# Bornes des histogrammes de volumes (requêtes SQL, lignes, octets)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+BYTES_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+# Mesure en cours (requête HTTP ou événement Socket.IO) du thread / greenlet courant
+_current = ContextVar("instrumentation_scope", default=None)
+
+
+class _Scope:
+    __slots__ = ("kind", "name", "started", "queries", "sql_seconds", "rows")
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+
+
+def payload_size(value):
+    """Taille approximative d’un message Socket.IO (JSON, octets bruts comptés tels quels)"""
+    try:
+        return len(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode())
+    except (TypeError, ValueError):
+        pass
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(payload_size(k) + payload_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_size(item) for item in value)
+    return len(str(value).encode())
+
+
+# ======================================================
+# ⏱️ Instrumentation des routes et des événements Socket.IO
+# ======================================================
+# Pour chaque endpoint HTTP et chaque événement Socket.IO : durée, nombre et
+# durée des requêtes SQL (événements du moteur SQLAlchemy), lignes chargées
+# par l’ORM et taille des données échangées. Les séries portent l’étiquette
+# worker : chaque processus tient les siennes (voir /metrics).
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_seconds = 0
+        self._listening = False
+
+    def init_app(self, app):
+        self.enabled = app.config["INSTRUMENTATION"]
+        self.slow_query_seconds = app.config["SLOW_QUERY_SECONDS"]
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if not self._listening:
+            # Écouteurs globaux, posés une seule fois (create_app peut être rappelée)
+            self._listening = True
+            event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+            event.listen(Engine, "handle_error", self._handle_error)
+            event.listen(Session, "loaded_as_persistent", self._loaded)
+
+    # --- HTTP ---
+    def _before_request(self):
+        scope = _Scope("http", request.endpoint or "<introuvable>")
+        g._instrumentation = (scope, _current.set(scope))
+
+    def _after_request(self, response):
+        state = g.get("_instrumentation")
+        if state is not None:
+            size = None if response.is_streamed else response.calculate_content_length()
+            g._instrumentation_response = (response.status_code, size)
+        return response
+
+    def _teardown_request(self, exc=None):
+        state = g.pop("_instrumentation", None)
+        if state is None:
+            return
+        scope, token = state
+        _current.reset(token)
+        status, size = g.pop("_instrumentation_response", (500, None))
+        labels = {"endpoint": scope.name, "worker": worker_id()}
+        metrics.observe(
+            "http_request_duration_seconds", time.perf_counter() - scope.started,
+            method=request.method, status=str(status), **labels,
+        )
+        self._record("http_request", scope, labels)
+        if size is not None:
+            metrics.observe("http_response_bytes", size, buckets=BYTES_BUCKETS, **labels)
+
+    # --- Socket.IO ---
+    def event(self, name):
+        """Décorateur d’un handler Socket.IO (à placer sous @socketio.on)"""
+        def decorator(handler):
+            @functools.wraps(handler)
+            def wrapper(*args):
+                if not self.enabled:
+                    return handler(*args)
+                scope = _Scope("socketio", name)
+                token = _current.set(scope)
+                try:
+                    result = handler(*args)
+                finally:
+                    _current.reset(token)
+                    labels = {"event": name, "worker": worker_id()}
+                    metrics.observe("socketio_event_duration_seconds", time.perf_counter() - scope.started, **labels)
+                    self._record("socketio_event", scope, labels)
+                    if args:
+                        metrics.observe("socketio_event_payload_bytes", payload_size(args[0]), buckets=BYTES_BUCKETS, **labels)
+                if result is not None:
+                    metrics.observe("socketio_ack_bytes", payload_size(result), buckets=BYTES_BUCKETS, **labels)
+                return result
+            return wrapper
+        return decorator
+
+    def _record(self, prefix, scope, labels):
+        metrics.observe(f"{prefix}_sql_queries", scope.queries, buckets=COUNT_BUCKETS, **labels)
+        metrics.observe(f"{prefix}_sql_seconds", scope.sql_seconds, **labels)
+        metrics.observe(f"{prefix}_rows_loaded", scope.rows, buckets=COUNT_BUCKETS, **labels)
+
+    # --- SQL ---
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("instrumentation_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["instrumentation_started"].pop()
+        elapsed = time.perf_counter() - started
+        scope = _current.get()
+        if scope is not None:
+            scope.queries += 1
+            scope.sql_seconds += elapsed
+        if self.slow_query_seconds and elapsed >= self.slow_query_seconds:
+            where = f"{scope.kind} {scope.name}" if scope is not None else "hors requête"
+            metrics.inc("sql_slow_queries_total", worker=worker_id())
+            slow_query_logger.warning("Requête SQL lente (%.1f ms, %s) : %s", elapsed * 1000, where, " ".join(statement.split())[:1000])
+
+    def _handle_error(self, context):
+        # Requête en échec : pas d’after_cursor_execute, on retire son départ
+        started = context.connection.info.get("instrumentation_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    def _loaded(self, session, instance):
+        # Lignes chargées par l’ORM (une par objet construit ou rafraîchi)
+        scope = _current.get()
+        if scope is not None:
+            scope.rows += 1
+
+
+instrumentation = Instrumentation()
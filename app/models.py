@@ -1,7 +1,7 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from app import db, login_manager
+from app.passwords import password_hasher
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,12 +10,18 @@ class User(db.Model, UserMixin):
     role = db.Column(db.String(20), default="member")
     active = db.Column(db.Boolean, default=True, index=True)
     messages = db.relationship("Message", backref="user", lazy=True)
+    read_receipts = db.relationship("ReadReceipt", lazy=True, cascade="all, delete-orphan")
 
+    # 🔐 Hachage dans le pool de processus (app.passwords) ; peut lever HasherBusy
     def set_password(self, pw):
-        self.password_hash = generate_password_hash(pw)
+        self.password_hash = password_hasher.hash(pw)
 
     def check_password(self, pw):
-        return check_password_hash(self.password_hash, pw)
+        """Vérifie le mot de passe ; réhache (à enregistrer) si PASSWORD_HASH_METHOD a changé"""
+        ok, new_hash = password_hasher.verify(self.password_hash, pw)
+        if new_hash:
+            self.password_hash = new_hash
+        return ok
 
     # 🔽 ajoute tes helpers de rôle ici
     def is_admin(self) -> bool:
@@ -34,30 +40,128 @@ class User(db.Model, UserMixin):
         return f"<User {self.username}>"
 
 class Room(db.Model):
+    # SQLite AUTOINCREMENT : l’id d’un salon supprimé n’est jamais réattribué
+    # (ses messages sont purgés en arrière-plan, cf. app.retention)
+    __table_args__ = {"sqlite_autoincrement": True}
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False, index=True)
+    last_seq = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # 🔁 app.sequences
+    retention_days = db.Column(db.Integer, nullable=True)  # 🗄️ None = MESSAGE_RETENTION_DAYS
+    # passive_deletes : supprimer un salon ne charge pas ses messages (purge par lots)
     messages = db.relationship(
         "Message",
         backref="room",
         lazy=True,
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
+    # Les clés étrangères SQLite ne sont pas appliquées : suppression via l’ORM
+    read_receipts = db.relationship("ReadReceipt", lazy=True, cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Room {self.name}>"
 
 class Message(db.Model):
+    # 📑 Index composite pour la pagination par curseur (room_id, timestamp, id)
+    # 🔁 (room_id, seq) : rattrapage "tout après seq X" d’un client reconnecté
+    # SQLite AUTOINCREMENT : ids jamais réutilisés, réservables par blocs (app.writer)
+    __table_args__ = (
+        db.Index("ix_message_room_timestamp_id", "room_id", "timestamp", "id"),
+        db.Index("ix_message_room_seq", "room_id", "seq", unique=True),
+        {"sqlite_autoincrement": True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
     room_id = db.Column(db.Integer, db.ForeignKey("room.id"), nullable=False, index=True)
-    is_read = db.Column(db.Boolean, default=False, index=True)
-    file_path = db.Column(db.String(255), nullable=True)  # 🆕
+    file_path = db.Column(db.String(255), nullable=True, index=True)  # 🆕 blob référencé (app.blobs)
+    seq = db.Column(db.Integer, nullable=True)  # 🔁 rang dans le salon (app.sequences)
+
+    def to_dict(self):
+        """Représentation JSON d'un message (historique, API)"""
+        return {
+            "id": self.id,
+            "seq": self.seq,
+            "user": self.user.username,
+            "user_id": self.user_id,
+            "room_id": self.room_id,
+            "content": self.content,
+            "file_path": self.file_path,
+            "timestamp": self.timestamp.strftime("%d/%m/%Y %H:%M"),
+            "ts": self.timestamp.isoformat(),
+        }
 
     def __repr__(self):
         return f"<Message {self.id} room={self.room_id}>"
 
+class MessageArchive(db.Model):
+    """Message sorti de la table message par la politique de rétention (app.retention)"""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # = Message.id
+    seq = db.Column(db.Integer, nullable=True)
+    room_id = db.Column(db.Integer, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    content = db.Column(db.Text, nullable=True)
+    file_path = db.Column(db.String(255), nullable=True, index=True)  # le blob reste référencé
+    timestamp = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<MessageArchive {self.id} room={self.room_id}>"
+
+class RoomPurge(db.Model):
+    """Salon supprimé dont les messages restent à effacer (reprise après redémarrage)"""
+    room_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(80), nullable=False)
+    requested_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<RoomPurge {self.room_id} {self.name}>"
+
+class ReadReceipt(db.Model):
+    """Dernier message lu par un utilisateur dans un salon (high-water mark)"""
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    room_id = db.Column(db.Integer, db.ForeignKey("room.id", ondelete="CASCADE"), primary_key=True)
+    last_read_id = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ReadReceipt user={self.user_id} room={self.room_id} last={self.last_read_id}>"
+
+class MessageCounter(db.Model):
+    """Compteurs de messages matérialisés (maintenus par app.stats)"""
+    scope = db.Column(db.String(10), primary_key=True)  # "room" ou "user" (total = somme des salons)
+    key = db.Column(db.Integer, primary_key=True)  # id du salon / de l’utilisateur
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<MessageCounter {self.scope}:{self.key}={self.value}>"
+
+class Blob(db.Model):
+    """Fichier envoyé, stocké une seule fois par contenu (maintenu par app.blobs)"""
+    path = db.Column(db.String(255), primary_key=True)  # = Message.file_path
+    sha256 = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)  # messages qui le référencent
+    last_used = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<Blob {self.sha256[:12]} refs={self.refcount}>"
+
+class PresenceSession(db.Model):
+    """Connexion Socket.IO ouverte (présence partagée entre workers)"""
+    sid = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    username = db.Column(db.String(80), nullable=False)
+    worker = db.Column(db.String(120), nullable=False, index=True)
+    connected_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<PresenceSession {self.username} sid={self.sid}>"
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # 🪪 Instantané en cache (app.identity) : pas de requête à chaque requête HTTP
+    from app.identity import identities
+    return identities.user(int(user_id))
@@ -0,0 +1,207 @@
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+from app.cache import TTLCache
+
+
+class HasherBusy(Exception):
+    """File d’attente du hachage pleine (ou délai dépassé) : réessayer plus tard"""
+
+
+def normalized_method(method):
+    """Forme complète d’une méthode Werkzeug ("scrypt" → "scrypt:32768:8:1"), telle
+    qu’elle préfixe les empreintes générées"""
+    name, *args = method.split(":")
+    if name == "scrypt":
+        n, r, p = args if args else (2**15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    return method
+
+
+# --- Exécuté dans les processus de hachage ---
+def _init_worker(parent_pid):
+    # Créé par fork, le processus hérite des sockets du serveur (port d’écoute,
+    # connexions clients) : il les ferme pour ne jamais les garder au-delà du parent
+    if os.path.isdir("/proc/self/fd"):
+        for name in os.listdir("/proc/self/fd"):
+            try:
+                fd = int(name)
+                if stat.S_ISSOCK(os.fstat(fd).st_mode):
+                    os.close(fd)
+            except (ValueError, OSError):
+                pass
+    try:
+        os.nice(10)  # le chat (processus serveur) garde la priorité sur le CPU
+    except OSError:
+        pass
+    threading.Thread(target=_exit_with_parent, args=(parent_pid,), daemon=True).start()
+
+
+def _exit_with_parent(parent_pid):
+    # Serveur tué sans arrêt propre : le pool ne lui survit pas
+    while os.getppid() == parent_pid:
+        time.sleep(1)
+    os._exit(0)
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password, method):
+    """(mot de passe correct, nouvelle empreinte si les paramètres ont changé)"""
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if password_hash.split("$", 1)[0] != normalized_method(method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+# ======================================================
+# 🔐 Hachage des mots de passe hors des threads du serveur
+# ======================================================
+# La fonction de dérivation (scrypt, ~0,3 s de CPU) tourne dans un pool borné
+# de KDF_WORKERS processus de priorité basse : une rafale de connexions ne
+# monopolise ni les threads ni le CPU du chat. Au-delà de KDF_QUEUE_LIMIT
+# calculs en attente, HasherBusy est levée tout de suite (503).
+# KDF_WORKERS = 0 : hachage dans le thread appelant (scripts, tests).
+class PasswordHasher:
+    def __init__(self):
+        self.method = "scrypt"
+        self.workers = 0
+        self.queue_limit = 0
+        self.timeout = None
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config["PASSWORD_HASH_METHOD"]
+        self.workers = app.config["KDF_WORKERS"]
+        self.queue_limit = app.config["KDF_QUEUE_LIMIT"]
+        self.timeout = app.config["KDF_TIMEOUT"] or None
+
+    def _executor(self):
+        # Créé au premier usage, dans le processus qui s’en sert (après le fork des workers)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker, initargs=(os.getpid(),)
+                )
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        with self._lock:
+            if self.queue_limit and self._pending >= self.queue_limit:
+                raise HasherBusy()
+            self._pending += 1
+        try:
+            return self._executor().submit(fn, *args).result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy() from None
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """(correct, nouvelle empreinte ou None) : réhachage si la méthode a changé"""
+        return self._run(_verify, password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """Hache une liste (import en masse) par fenêtres de `workers` calculs : les
+        connexions soumises entre-temps passent entre deux fenêtres"""
+        if not self.workers:
+            return [_hash(password, self.method) for password in passwords]
+        pool = self._executor()
+        hashes = []
+        for start in range(0, len(passwords), self.workers):
+            window = [pool.submit(_hash, password, self.method) for password in passwords[start:start + self.workers]]
+            hashes.extend(future.result() for future in window)
+        return hashes
+
+    def pending(self):
+        return self._pending
+
+
+password_hasher = PasswordHasher()
+
+
+# ======================================================
+# 🚦 Seaux à jetons (tentatives de connexion)
+# ======================================================
+class TokenBuckets:
+    """Un seau de `capacity` jetons par clé, regarni de `rate` jetons par seconde.
+
+    Les seaux pleins n’ont pas besoin d’être gardés : le cache LRU borne la
+    mémoire face à une rafale de noms ou d’adresses différents.
+    """
+
+    def __init__(self, capacity, rate, maxsize=100_000):
+        self.capacity = capacity
+        self.rate = rate
+        ttl = capacity / rate if rate else None
+        self._buckets = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _level(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def allowed(self, key):
+        """Reste-t-il au moins un jeton (sans le consommer) ?"""
+        if not self.capacity:
+            return True
+        return self._level(key, time.monotonic()) >= 1
+
+    def take(self, key):
+        """Consomme un jeton ; False si le seau est vide"""
+        if not self.capacity:
+            return True
+        with self._buckets.lock:
+            now = time.monotonic()
+            tokens = self._level(key, now)
+            if tokens < 1:
+                return False
+            self._buckets.set(key, (tokens - 1, now))
+            return True
+
+
+class LoginThrottle:
+    """Limites de tentatives de connexion, par adresse IP et par nom d’utilisateur.
+
+    - IP : chaque tentative consomme un jeton (LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE) ;
+    - nom : seuls les échecs en consomment (LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE) :
+      les connexions réussies ne l’entament pas, et un essai de mots de passe sur
+      un compte est ramené à quelques tentatives par minute, d’où qu’il vienne.
+    Un seau vide refuse la tentative avant tout calcul de hachage.
+    Limites propres à chaque worker.
+    """
+
+    def __init__(self):
+        self.by_ip = TokenBuckets(0, 0)
+        self.by_user = TokenBuckets(0, 0)
+
+    def init_app(self, app):
+        self.by_ip = TokenBuckets(app.config["LOGIN_IP_BURST"], app.config["LOGIN_IP_PER_MINUTE"] / 60)
+        self.by_user = TokenBuckets(app.config["LOGIN_USER_BURST"], app.config["LOGIN_USER_PER_MINUTE"] / 60)
+
+    def attempt(self, ip, username):
+        """False si la tentative doit être refusée"""
+        return self.by_user.allowed(username.lower()) and self.by_ip.take(ip)
+
+    def failed(self, username):
+        self.by_user.take(username.lower())
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,188 @@
+import atexit
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from flask import current_app
+from app import db, socketio
+from app.models import PresenceSession
+
+
+def worker_id(pid=None):
+    """Identifiant d’un processus serveur (hôte:pid), le processus courant par défaut"""
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+class MemoryPresence:
+    """Présence tenue en mémoire : un seul processus serveur.
+
+    Chaque utilisateur a un compteur de sessions (onglets, appareils) : il
+    n’est hors ligne qu’à la fermeture de la dernière.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def connect(self, sid, user_id, username):
+        """Renvoie True si c’est la première session de l’utilisateur"""
+        with self._lock:
+            if sid in self._sessions:
+                return False
+            self._sessions[sid] = username
+            self._counts[username] += 1
+            return self._counts[username] == 1
+
+    def disconnect(self, sid):
+        """Renvoie (nom de l’utilisateur de la session fermée ou None, True s’il n’a plus de session)"""
+        with self._lock:
+            username = self._sessions.pop(sid, None)
+            if username is None:
+                return None, False
+            self._counts[username] -= 1
+            if self._counts[username] > 0:
+                return username, False
+            del self._counts[username]
+            return username, True
+
+    def online_users(self):
+        with self._lock:
+            return sorted(self._counts)
+
+    def purge_workers(self, keep=()):
+        pass
+
+
+class DatabasePresence:
+    """Présence partagée par tous les workers via la table presence_session"""
+
+    def __init__(self):
+        self._registered = set()
+
+    def connect(self, sid, user_id, username):
+        worker = worker_id()
+        db.session.merge(PresenceSession(sid=sid, user_id=user_id, username=username, worker=worker))
+        db.session.commit()
+        if worker not in self._registered:
+            # Nettoie les sessions de ce worker à son arrêt
+            self._registered.add(worker)
+            atexit.register(self._purge_worker, current_app._get_current_object(), worker)
+        return PresenceSession.query.filter_by(user_id=user_id).count() == 1
+
+    def disconnect(self, sid):
+        session = db.session.get(PresenceSession, sid)
+        if session is None:
+            return None, False
+        username, user_id = session.username, session.user_id
+        db.session.delete(session)
+        db.session.commit()
+        remaining = db.session.query(PresenceSession.sid).filter_by(user_id=user_id).first()
+        return username, remaining is None
+
+    def online_users(self):
+        rows = db.session.query(PresenceSession.username).distinct().order_by(PresenceSession.username)
+        return [username for (username,) in rows]
+
+    def purge_workers(self, keep=()):
+        """Supprime les sessions des workers qui ne font pas partie de `keep`"""
+        PresenceSession.query.filter(PresenceSession.worker.notin_(list(keep))).delete(synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def _purge_worker(app, worker):
+        with app.app_context():
+            PresenceSession.query.filter_by(worker=worker).delete()
+            db.session.commit()
+
+
+class Presence:
+    """Point d’entrée unique ; le stockage est choisi par init_app.
+
+    Dès qu’une file de messages relie plusieurs workers (SOCKETIO_MESSAGE_QUEUE),
+    la présence est partagée via la base de données.
+
+    Seules les arrivées et départs réels (première / dernière session d’un
+    utilisateur) sont diffusés, regroupés toutes les PRESENCE_DEBOUNCE secondes
+    dans un seul "presence_delta" {"joined": [...], "left": [...]} ; un départ
+    suivi d’un retour dans la même fenêtre (rechargement de page) s’annule.
+    La liste complète n’est envoyée qu’à la demande (snapshot), depuis un
+    cache renouvelé au plus une fois par fenêtre : une vague de reconnexions
+    après un déploiement ne coûte plus O(N) diffusions de O(N) noms.
+    """
+
+    def __init__(self):
+        self.backend = MemoryPresence()
+        self.debounce = 0.5
+        self._changes = {}
+        self._flushing = False
+        self._snapshot = None
+        self._snapshot_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.backend = DatabasePresence() if app.config["SOCKETIO_MESSAGE_QUEUE"] else MemoryPresence()
+        self.debounce = app.config["PRESENCE_DEBOUNCE"]
+        with self._lock:
+            self._changes.clear()
+            self._snapshot = None
+
+    def connect(self, sid, user_id, username):
+        if self.backend.connect(sid, user_id, username):
+            self._note(username, 1)
+
+    def disconnect(self, sid):
+        """Renvoie le nom de l’utilisateur de la session fermée (ou None)"""
+        username, offline = self.backend.disconnect(sid)
+        if offline:
+            self._note(username, -1)
+        return username
+
+    def online_users(self):
+        return self.backend.online_users()
+
+    def snapshot(self):
+        """Liste triée des connectés, recalculée au plus une fois par fenêtre de regroupement"""
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._snapshot_at < self.debounce:
+                return self._snapshot
+        users = self.backend.online_users()
+        with self._lock:
+            self._snapshot, self._snapshot_at = users, time.monotonic()
+        return users
+
+    def _note(self, username, delta):
+        with self._lock:
+            if self._changes.get(username, delta) != delta:
+                del self._changes[username]  # arrivée puis départ (ou l’inverse) : rien à annoncer
+            else:
+                self._changes[username] = delta
+            if self._flushing:
+                return
+            self._flushing = True
+        if self.debounce > 0:
+            socketio.start_background_task(self._flush_later)
+        else:
+            self._flush()
+
+    def _flush_later(self):
+        socketio.sleep(self.debounce)
+        self._flush()
+
+    def _flush(self):
+        with self._lock:
+            changes, self._changes = self._changes, {}
+            self._flushing = False
+            self._snapshot = None  # un client arrivé après cette diffusion doit la voir
+        if changes:
+            socketio.emit("presence_delta", {
+                "joined": sorted(u for u, d in changes.items() if d > 0),
+                "left": sorted(u for u, d in changes.items() if d < 0),
+            }, namespace="/")
+
+    def purge_workers(self, keep=()):
+        self.backend.purge_workers(keep)
+
+
+presence = Presence()
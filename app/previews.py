@@ -0,0 +1,165 @@
+import importlib.util
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import uuid
+from app import socketio
+from app.blobs import disk_path, preview_path
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+
+
+class PreviewGenerator:
+    """Aperçus réduits des fichiers envoyés (miniature d’image, 1re page de PDF).
+
+    Un pool de PREVIEW_WORKERS threads les produit en arrière-plan après
+    l’envoi, puis prévient le salon par "file_preview". Chaque aperçu est
+    écrit une seule fois sur disque, à côté du fichier (cf. preview_path) :
+    les fichiers étant rangés par empreinte, il est valable pour toujours.
+
+    Dépendances optionnelles : Pillow (images) et pdftoppm de poppler-utils
+    (PDF). Sans elles, l’original reste affiché.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self._queue = None
+        self._threads = []
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.size = app.config["PREVIEW_SIZE"]
+        self.extensions = set()
+        if importlib.util.find_spec("PIL"):
+            self.extensions |= IMAGE_EXTENSIONS
+        else:
+            logger.info("Pillow absent : pas de miniatures d’images")
+        self.pdftoppm = shutil.which("pdftoppm")
+        if self.pdftoppm:
+            self.extensions.add("pdf")
+        self.enabled = bool(self.extensions) and app.config["PREVIEW_WORKERS"] > 0
+        if not self.enabled:
+            return
+
+        # 🌿 eventlet / gevent : le redimensionnement part dans le pool de threads natifs
+        async_mode = app.config["SOCKETIO_ASYNC_MODE"]
+        if async_mode in ("eventlet", "gevent"):
+            from app.green import _thread_runner
+            self._call = _thread_runner(async_mode)
+        else:
+            self._call = lambda fn, args, kwargs: fn(*args, **kwargs)
+        self._queue = queue.Queue()
+
+    def supports(self, file_path):
+        return self.enabled and file_path.rsplit(".", 1)[-1].lower() in self.extensions
+
+    def lookup(self, file_path, room_id=None, message_id=None):
+        """Renvoie (aperçu déjà produit ou None, True s’il est en cours de production).
+
+        Un aperçu manquant est demandé au passage ; si room_id est fourni, le
+        salon reçoit "file_preview" quand il est prêt.
+        """
+        path = self.existing(file_path)
+        if path is not None or not file_path:
+            return path, False
+        return None, self.submit(file_path, room_id, message_id)
+
+    def existing(self, file_path):
+        """Chemin de l’aperçu s’il est déjà sur disque, sinon None"""
+        if not file_path or not self.supports(file_path):
+            return None
+        path = preview_path(file_path)
+        return path if os.path.exists(disk_path(path)) else None
+
+    def submit(self, file_path, room_id=None, message_id=None):
+        """Demande l’aperçu d’un fichier ; renvoie True s’il sera produit en arrière-plan"""
+        if not self.supports(file_path):
+            return False
+        with self._lock:
+            if file_path in self._pending:
+                if room_id is None:
+                    return True
+            else:
+                self._pending.add(file_path)
+            self._ensure_started()
+        self._queue.put((file_path, room_id, message_id))
+        return True
+
+    def _ensure_started(self):
+        if not self._threads:
+            for n in range(self.app.config["PREVIEW_WORKERS"]):
+                thread = threading.Thread(target=self._run, name=f"preview-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            file_path, room_id, message_id = self._queue.get()
+            path = preview_path(file_path)
+            try:
+                with self.app.app_context():
+                    target = disk_path(path)
+                    if not os.path.exists(target):
+                        self._call(self._render, (disk_path(file_path), target), {})
+            except Exception:
+                logger.exception("Échec de l’aperçu de %s", file_path)
+                path = None
+            finally:
+                with self._lock:
+                    self._pending.discard(file_path)
+
+            if room_id is not None:
+                socketio.emit("file_preview", {
+                    "id": message_id,
+                    "room_id": room_id,
+                    "file_path": file_path,
+                    "preview_path": path,
+                }, to=f"room-{room_id}", namespace="/")
+
+    def _render(self, src, target):
+        """Écrit l’aperçu JPEG de src dans target (écriture atomique)"""
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            if src.lower().endswith(".pdf"):
+                self._render_pdf(src, tmp)
+            else:
+                self._render_image(src, tmp)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _render_image(self, src, tmp):
+        from PIL import Image, ImageOps
+
+        with Image.open(src) as img:
+            img.draft("RGB", (self.size, self.size))  # JPEG : décodage directement à l’échelle réduite
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((self.size, self.size))
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, "white")
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            img.convert("RGB").save(tmp, "JPEG", quality=80, optimize=True)
+
+    def _render_pdf(self, src, tmp):
+        # pdftoppm ajoute lui-même l’extension .jpg au préfixe de sortie
+        subprocess.run(
+            [self.pdftoppm, "-f", "1", "-l", "1", "-singlefile", "-jpeg",
+             "-scale-to", str(self.size), src, tmp],
+            check=True, capture_output=True, timeout=30,
+        )
+        os.replace(f"{tmp}.jpg", tmp)
+
+
+previews = PreviewGenerator()
@@ -0,0 +1,188 @@
+import json
+import threading
+from collections import OrderedDict, deque
+from app.metrics import metrics
+from app.presence import worker_id
+
+
+def message_dict(msg_id, username, user_id, room_id, content, file_path, timestamp, seq):
+    """Même forme que Message.to_dict(), sans objet ORM (messages en écriture différée)"""
+    return {
+        "id": msg_id,
+        "seq": seq,
+        "user": username,
+        "user_id": user_id,
+        "room_id": room_id,
+        "content": content,
+        "file_path": file_path,
+        "timestamp": timestamp.strftime("%d/%m/%Y %H:%M"),
+        "ts": timestamp.isoformat(),
+    }
+
+
+class _RoomBuffer:
+    __slots__ = ("items", "sizes", "bytes", "has_more")
+
+    def __init__(self, maxlen):
+        self.items = deque(maxlen=maxlen)
+        self.sizes = deque(maxlen=maxlen)
+        self.bytes = 0
+        self.has_more = False  # des messages plus anciens existent en base
+
+
+class RecentMessages:
+    """Derniers messages sérialisés des salons actifs, servis sans requête SQL.
+
+    - un tampon circulaire de RECENT_MESSAGES_PER_ROOM messages par salon ;
+    - les salons les moins récemment lus ou écrits sont évincés dès que le
+      total dépasse RECENT_MESSAGES_MAX_BYTES (taille JSON des messages) ;
+    - un salon n’entre en mémoire que depuis la base (fill) : un tampon présent
+      est toujours la fin exacte de l’historique, les envois s’y ajoutent (push).
+
+    Chaque worker a ses propres tampons : désactivé par défaut en multi-workers,
+    comme le cache des non-lus (un worker ne voit pas les envois des autres).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.per_room = 0
+        self.max_bytes = 0
+        self._rooms = OrderedDict()
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.per_room = app.config["RECENT_MESSAGES_PER_ROOM"]
+        self.max_bytes = app.config["RECENT_MESSAGES_MAX_BYTES"]
+        self.enabled = self.per_room > 0 and self.max_bytes > 0
+        self.clear()
+
+    def _count(self, name, value=1):
+        metrics.inc(f"recent_messages_{name}_total", value, worker=worker_id())
+
+    def get(self, room_id, limit):
+        """(messages du plus récent au plus ancien, il en reste d’autres en base) ou None si absent"""
+        if not self.enabled or limit > self.per_room:
+            return None
+        with self._lock:
+            buffer = self._rooms.get(room_id)
+            if buffer is not None:
+                self._rooms.move_to_end(room_id)
+                items = list(buffer.items)[-limit:]
+                has_more = buffer.has_more or len(buffer.items) > limit
+        self._count("hits" if buffer is not None else "misses")
+        if buffer is None:
+            return None
+        return items[::-1], has_more
+
+    def after(self, room_id, seq):
+        """Messages de seq supérieure (ordre croissant), ou None si le tampon ne les couvre pas tous"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            buffer = self._rooms.get(room_id)
+            covered = buffer is not None and (
+                # le plus ancien message gardé suit directement `seq` (ou le précède)
+                not buffer.has_more or (buffer.items and (buffer.items[0]["seq"] or 0) <= seq + 1)
+            )
+            if covered:
+                self._rooms.move_to_end(room_id)
+                items = [data for data in buffer.items if (data["seq"] or 0) > seq]
+        self._count("hits" if covered else "misses")
+        if not covered:
+            return None
+        return sorted(items, key=lambda data: data["seq"])
+
+    def version(self, room_id):
+        """À relever avant de lire la base, puis à passer à fill()"""
+        with self._lock:
+            return self._versions.get(room_id, 0)
+
+    def fill(self, room_id, messages, has_more, version):
+        """Charge un salon depuis une page lue en base (du plus récent au plus ancien).
+
+        Ignoré si un envoi a eu lieu pendant la lecture (la page pourrait le manquer).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._versions.get(room_id, 0) != version or room_id in self._rooms:
+                return
+            buffer = _RoomBuffer(self.per_room)
+            buffer.has_more = has_more or len(messages) > self.per_room
+            self._rooms[room_id] = buffer
+            for data in reversed(messages[:self.per_room]):
+                self._append(buffer, data)
+            self._evict()
+
+    def push(self, data):
+        """Ajoute un message envoyé à la fin du tampon de son salon (s’il est en mémoire)"""
+        if not self.enabled:
+            return
+        room_id = data["room_id"]
+        with self._lock:
+            self._versions[room_id] = self._versions.get(room_id, 0) + 1
+            buffer = self._rooms.get(room_id)
+            if buffer is None:
+                return
+            self._rooms.move_to_end(room_id)
+            last = buffer.items[-1] if buffer.items else None
+            self._append(buffer, data)
+            if last is not None and (data["ts"], data["id"]) < (last["ts"], last["id"]):
+                # Deux envois simultanés arrivés dans le désordre : ordre de l’historique
+                ordered = sorted(zip(buffer.items, buffer.sizes), key=lambda item: (item[0]["ts"], item[0]["id"]))
+                buffer.items.clear()
+                buffer.sizes.clear()
+                for item, size in ordered:
+                    buffer.items.append(item)
+                    buffer.sizes.append(size)
+            self._evict()
+
+    def discard(self, room_id):
+        """Oublie un salon (message retiré, écriture échouée) : il sera relu en base"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._versions[room_id] = self._versions.get(room_id, 0) + 1
+            buffer = self._rooms.pop(room_id, None)
+            if buffer is not None:
+                self._bytes -= buffer.bytes
+
+    def clear(self):
+        with self._lock:
+            self._rooms.clear()
+            self._versions.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rooms": len(self._rooms),
+                "messages": sum(len(buffer.items) for buffer in self._rooms.values()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _append(self, buffer, data):
+        size = len(json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode())
+        if len(buffer.items) == buffer.items.maxlen:
+            buffer.bytes -= buffer.sizes[0]
+            self._bytes -= buffer.sizes[0]
+            buffer.has_more = True
+        buffer.items.append(data)
+        buffer.sizes.append(size)
+        buffer.bytes += size
+        self._bytes += size
+
+    def _evict(self):
+        evicted = 0
+        while self._bytes > self.max_bytes and len(self._rooms) > 1:
+            _, buffer = self._rooms.popitem(last=False)
+            self._bytes -= buffer.bytes
+            evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+
+
+recent_messages = RecentMessages()
@@ -0,0 +1,274 @@
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, literal, select
+from app import db, socketio
+from app.blobs import apply_blob_deltas, collect_blobs
+from app.identity import identities
+from app.models import Message, MessageArchive, MessageCounter, ReadReceipt, Room, RoomPurge
+from app.recent import recent_messages
+from app.sequences import room_sequences
+from app.stats import apply_deltas
+
+logger = logging.getLogger(__name__)
+
+retention_cli = AppGroup("retention", help="Rétention des messages et purge des salons supprimés.")
+
+ARCHIVED_COLUMNS = ["id", "seq", "room_id", "user_id", "content", "file_path", "timestamp"]
+
+
+# ======================================================
+# 🗄️ Rétention : archivage des anciens messages, par lots
+# ======================================================
+# Chaque lot est une transaction courte (ids lus par l’index (room_id, timestamp, id),
+# puis INSERT ... SELECT et DELETE ensemblistes) : les envois du chat passent
+# entre deux lots. La table message garde une taille et une profondeur
+# d’index bornées ; les messages archivés gardent leurs fichiers.
+#
+# Ces écritures en masse ne déclenchent pas les événements de l’ORM :
+# compteurs (app.stats) et références de fichiers (app.blobs) sont ajustés ici.
+def retention_cutoffs(now=None):
+    """{room_id: date limite} des salons soumis à une rétention"""
+    now = now or datetime.utcnow()
+    default = current_app.config["MESSAGE_RETENTION_DAYS"]
+    cutoffs = {}
+    for room_id, days in db.session.query(Room.id, Room.retention_days):
+        days = days if days is not None else default
+        if days and days > 0:
+            cutoffs[room_id] = now - timedelta(days=days)
+    return cutoffs
+
+
+def archive_room(room_id, cutoff):
+    """Archive les messages du salon antérieurs à `cutoff` ; renvoie leur nombre"""
+    batch_size = current_app.config["RETENTION_BATCH_SIZE"]
+    archive = MessageArchive.__table__
+    messages = Message.__table__
+    total = 0
+    while True:
+        ids = db.session.execute(
+            select(Message.id)
+            .where(Message.room_id == room_id, Message.timestamp < cutoff)
+            .order_by(Message.timestamp, Message.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.session.execute(archive.insert().from_select(
+            ARCHIVED_COLUMNS + ["archived_at"],
+            select(*[messages.c[name] for name in ARCHIVED_COLUMNS], literal(datetime.utcnow()))
+            .where(messages.c.id.in_(ids)),
+        ))
+        _remove_messages(ids, release_files=False)
+        db.session.commit()
+        total += len(ids)
+        socketio.sleep(0)
+    if total:
+        recent_messages.discard(room_id)
+    return total
+
+
+def apply_retention():
+    """Applique la rétention à tous les salons ; renvoie {room_id: messages archivés}"""
+    archived = {}
+    for room_id, cutoff in retention_cutoffs().items():
+        count = archive_room(room_id, cutoff)
+        if count:
+            archived[room_id] = count
+    return archived
+
+
+def _remove_messages(ids, release_files):
+    """Supprime des messages (DELETE ensembliste) en ajustant compteurs et références.
+
+    Renvoie les fichiers dont une référence a été libérée.
+    """
+    connection = db.session.connection()
+    messages = Message.__table__
+    deltas = Counter()
+    for room_id, user_id, count in db.session.execute(
+        select(Message.room_id, Message.user_id, func.count())
+        .where(Message.id.in_(ids))
+        .group_by(Message.room_id, Message.user_id)
+    ):
+        deltas[("room", room_id)] -= count
+        deltas[("user", user_id)] -= count
+    apply_deltas(connection, deltas)
+
+    released = {}
+    if release_files:
+        released = dict(db.session.execute(
+            select(Message.file_path, func.count())
+            .where(Message.id.in_(ids), Message.file_path.isnot(None))
+            .group_by(Message.file_path)
+        ).all())
+        apply_blob_deltas(connection, {path: -count for path, count in released.items()})
+
+    db.session.execute(messages.delete().where(messages.c.id.in_(ids)))
+    return set(released)
+
+
+# ======================================================
+# 🗑️ Suppression d’un salon : immédiate pour l’utilisateur, purge en arrière-plan
+# ======================================================
+def delete_room(room):
+    """Retire le salon tout de suite (quelques lignes) et programme la purge de ses messages"""
+    room_id = room.id
+    db.session.add(RoomPurge(room_id=room_id, name=room.name))
+    db.session.execute(ReadReceipt.__table__.delete().where(ReadReceipt.room_id == room_id))
+    db.session.execute(Room.__table__.delete().where(Room.id == room_id))
+    db.session.commit()
+    recent_messages.discard(room_id)
+    room_sequences.forget(room_id)
+    identities.invalidate_room(room_id)
+    room_purger.wake(current_app._get_current_object())
+
+
+def purge_room(room_id):
+    """Efface par lots les messages (actifs et archivés) d’un salon supprimé"""
+    batch_size = current_app.config["RETENTION_BATCH_SIZE"]
+    archive = MessageArchive.__table__
+    released = set()
+    total = 0
+    while True:
+        ids = db.session.execute(
+            select(Message.id).where(Message.room_id == room_id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        released |= _remove_messages(ids, release_files=True)
+        db.session.commit()
+        total += len(ids)
+        socketio.sleep(0)
+
+    while True:
+        ids = db.session.execute(
+            select(MessageArchive.id).where(MessageArchive.room_id == room_id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        files = dict(db.session.execute(
+            select(MessageArchive.file_path, func.count())
+            .where(MessageArchive.id.in_(ids), MessageArchive.file_path.isnot(None))
+            .group_by(MessageArchive.file_path)
+        ).all())
+        apply_blob_deltas(db.session.connection(), {path: -count for path, count in files.items()})
+        db.session.execute(archive.delete().where(archive.c.id.in_(ids)))
+        db.session.commit()
+        released |= set(files)
+        total += len(ids)
+        socketio.sleep(0)
+
+    db.session.execute(MessageCounter.__table__.delete().where(
+        MessageCounter.scope == "room", MessageCounter.key == room_id
+    ))
+    db.session.execute(RoomPurge.__table__.delete().where(RoomPurge.room_id == room_id))
+    db.session.commit()
+    if released:
+        collect_blobs(released)
+    return total
+
+
+def purge_pending_rooms():
+    """Purge les salons supprimés en attente (y compris ceux d’un arrêt précédent)"""
+    total = 0
+    pending = db.session.execute(
+        select(RoomPurge.room_id, RoomPurge.name).order_by(RoomPurge.requested_at)
+    ).all()
+    for room_id, name in pending:
+        started = time.perf_counter()
+        count = purge_room(room_id)
+        logger.info("Salon %s purgé : %d messages en %.1fs", name, count, time.perf_counter() - started)
+        total += count
+    return total
+
+
+class RoomPurger:
+    """Tâche de fond unique par processus qui vide la file des purges de salons"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = False
+        self._again = False
+
+    def wake(self, app):
+        with self._lock:
+            if self._running:
+                self._again = True  # une purge demandée pendant le passage en cours
+                return
+            self._running = True
+        socketio.start_background_task(self._run, app)
+
+    def _run(self, app):
+        while True:
+            with app.app_context():
+                try:
+                    purge_pending_rooms()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Échec de la purge d’un salon supprimé")
+            with self._lock:
+                if not self._again:
+                    self._running = False
+                    return
+                self._again = False
+
+
+room_purger = RoomPurger()
+
+
+def start_retention(app):
+    """Lance la rétention périodique (RETENTION_INTERVAL secondes, 0 = désactivée) ;
+    reprend d’abord les purges de salons interrompues"""
+    room_purger.wake(app)
+    interval = app.config["RETENTION_INTERVAL"]
+    if not interval:
+        return
+
+    def run():
+        while True:
+            socketio.sleep(interval)
+            with app.app_context():
+                try:
+                    apply_retention()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Échec de l’application de la rétention")
+
+    socketio.start_background_task(run)
+
+
+@retention_cli.command("run")
+def run_command():
+    """Archive les messages échus et purge les salons supprimés."""
+    started = time.perf_counter()
+    purged = purge_pending_rooms()
+    archived = apply_retention()
+    print(f"✔ {sum(archived.values())} messages archivés ({len(archived)} salons), "
+          f"{purged} messages de salons supprimés effacés en {time.perf_counter() - started:.1f}s")
+
+
+@retention_cli.command("set")
+@click.argument("room_id", type=int)
+@click.argument("days", type=int)
+def set_command(room_id, days):
+    """Durée de conservation d’un salon en jours (0 = illimitée, -1 = valeur par défaut)."""
+    room = db.session.get(Room, room_id)
+    if room is None:
+        raise click.ClickException(f"Salon {room_id} introuvable")
+    room.retention_days = None if days < 0 else days
+    db.session.commit()
+    print(f"✔ {room.name} : {describe_retention(room)}")
+
+
+def describe_retention(room):
+    days = room.retention_days
+    if days is None:
+        days = current_app.config["MESSAGE_RETENTION_DAYS"]
+        return f"{days} jours (par défaut)" if days else "illimitée (par défaut)"
+    return f"{days} jours" if days else "illimitée"
@@ -1,6 +1,12 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort, Response, stream_with_context
 from flask_login import login_required, current_user
-from app.models import User, Room, Message
+from app.models import Room, User
+from app.identity import identities
+from app.export import EXPORTERS, FORMATS, export_filename
+from app.stats import dashboard_stats
+from app.metrics import metrics
+from app.recent import recent_messages
+from app.user_import import guess_format, import_users, read_rows, summarize
 from app import db
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
@@ -14,34 +20,51 @@ def dashboard():
         flash("⛔ Accès réservé aux administrateurs.", "danger")
         return redirect(url_for("main.index"))
 
-    total_users = User.query.count()
-    total_rooms = Room.query.count()
-    total_messages = Message.query.count()
-
-    room_stats = []
-    for room in Room.query.order_by(Room.name.asc()).all():
-        count = Message.query.filter_by(room_id=room.id).count()
-        room_stats.append({"name": room.name, "count": count})
-
-    top_users = (
-        db.session.query(User.username, db.func.count(Message.id).label("count"))
-        .join(Message)
-        .group_by(User.id)
-        .order_by(db.func.count(Message.id).desc())
-        .limit(5)
-        .all()
-    )
+    # 📊 Compteurs matérialisés, servis depuis un cache TTL
+    stats = dashboard_stats()
 
     return render_template(
         "admin_dashboard.html",
-        total_users=total_users,
-        total_rooms=total_rooms,
-        total_messages=total_messages,
-        room_stats=room_stats,
-        top_users=top_users,
+        total_users=stats["total_users"],
+        total_rooms=stats["total_rooms"],
+        total_messages=stats["total_messages"],
+        room_stats=stats["room_stats"],
+        top_users=stats["top_users"],
     )
 
 
+# === Métriques internes (fan-out Socket.IO, etc.) au format JSON ===
+@admin_bp.route("/metrics")
+@login_required
+def metrics_snapshot():
+    if current_user.role != "admin":
+        flash("⛔ Accès réservé aux administrateurs.", "danger")
+        return redirect(url_for("main.index"))
+
+    return jsonify(dict(metrics.snapshot(), recent_messages=recent_messages.stats()))
+
+
+# 📤 Export de l’historique (un salon ou tous) : NDJSON, CSV ou ZIP avec pièces jointes
+# Réponse en flux : la mémoire du worker ne dépend pas de la taille de l’historique
+@admin_bp.route("/export")
+@login_required
+def export():
+    if current_user.role != "admin":
+        flash("⛔ Accès réservé aux administrateurs.", "danger")
+        return redirect(url_for("main.index"))
+
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in FORMATS:
+        abort(400)
+    room_id = request.args.get("room_id", type=int)
+    room = Room.query.get_or_404(room_id) if room_id is not None else None
+
+    response = Response(stream_with_context(EXPORTERS[fmt](room_id)), mimetype=FORMATS[fmt][0])
+    response.headers["Content-Disposition"] = f'attachment; filename="{export_filename(room, fmt)}"'
+    response.headers["X-Accel-Buffering"] = "no"  # nginx : transmettre au fil de l’eau
+    return response
+
+
 # === Gestion des utilisateurs avec recherche + pagination ===
 @admin_bp.route("/users", methods=["GET", "POST"])
 @login_required
@@ -94,6 +117,38 @@ def users():
     )
 
 
+# 📥 Import de comptes en masse (fichier CSV / JSON du formulaire, ou corps JSON)
+# Réponse JSON pour les appels d’API (corps JSON ou ?format=json), sinon rapport HTML
+@admin_bp.route("/users/import", methods=["POST"])
+@login_required
+def import_users_route():
+    if current_user.role != "admin":
+        flash("⛔ Accès réservé aux administrateurs.", "danger")
+        return redirect(url_for("main.index"))
+
+    as_json = request.is_json or request.args.get("format") == "json"
+    try:
+        if request.is_json:
+            rows = read_rows(request.get_data(), "json")
+        else:
+            file = request.files.get("file")
+            if not file or file.filename == "":
+                raise ValueError("Aucun fichier sélectionné")
+            rows = read_rows(file.read(), request.form.get("format") or guess_format(file.filename))
+    except ValueError as e:
+        if as_json:
+            return jsonify(error=str(e)), 400
+        flash(f"⚠️ {e}", "warning")
+        return redirect(url_for("admin.users"))
+
+    report = import_users(rows)
+    summary = summarize(report)
+    if as_json:
+        return jsonify(summary=summary, rows=report)
+    flash(f"📥 {summary.get('created', 0)} compte(s) créé(s) sur {len(report)} ligne(s).", "success")
+    return render_template("admin_import_report.html", report=report, summary=summary)
+
+
 # ✅ Activer / désactiver un utilisateur
 @admin_bp.route("/toggle/<int:user_id>")
 @login_required
@@ -109,6 +164,7 @@ def toggle_user(user_id):
 
     user.active = not user.active
     db.session.commit()
+    identities.invalidate_user(user.id)
     status = "activé" if user.active else "désactivé"
     flash(f"✅ Utilisateur {user.username} {status}.", "success")
     return redirect(url_for("admin.users"))
@@ -135,6 +191,7 @@ def promote_user(user_id):
         flash(f"⭐ {user.username} est maintenant administrateur.", "success")
 
     db.session.commit()
+    identities.invalidate_user(user.id)
     return redirect(url_for("admin.users"))
 
 # 🗑️ Supprimer un utilisateur
@@ -152,9 +209,11 @@ def delete_user(user_id):
         flash("🚫 Impossible de supprimer l’administrateur principal.", "danger")
         return redirect(url_for("admin.users"))
 
+    username = user.username
     db.session.delete(user)
     db.session.commit()
-    flash(f"🗑️ Utilisateur '{user.username}' supprimé avec succès.", "success")
+    identities.invalidate_user(user_id)
+    flash(f"🗑️ Utilisateur '{username}' supprimé avec succès.", "success")
     return redirect(url_for("admin.users"))
 
 # ✏️ Modifier un utilisateur (rôle ou mot de passe)
@@ -185,6 +244,7 @@ def edit_user(user_id):
         flash(f"🔒 Mot de passe de {user.username} réinitialisé.", "info")
 
     db.session.commit()
+    identities.invalidate_user(user.id)
     return redirect(url_for("admin.users"))
 
 # 🔁 Réinitialiser le mot de passe d’un utilisateur
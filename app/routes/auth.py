@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, current_user, login_required
+from sqlalchemy import inspect
 from app.models import User
+from app.passwords import HasherBusy, login_throttle
 from app import db
 
 # 🔐 Blueprint Authentification
@@ -19,14 +21,33 @@ def login():
     if request.method == "POST":
         username = request.form["username"].strip()
         password = request.form["password"].strip()
+
+        # 🚦 Trop de tentatives (adresse ou compte) : refus avant tout calcul de hachage
+        if not login_throttle.attempt(request.remote_addr or "", username):
+            flash("⏳ Trop de tentatives de connexion, réessayez dans une minute.", "danger")
+            return render_template("login.html"), 429, {"Retry-After": "60"}
+
         user = User.query.filter_by(username=username).first()
+        # La connexion à la base est rendue au pool avant d’attendre le hachage :
+        # une file de connexions ne doit pas priver le chat de connexions SQL
+        db.session.close()
 
         # Vérifie l'existence, le mot de passe et l'état actif
-        if user and user.check_password(password) and user.active:
+        try:
+            valid = user is not None and user.check_password(password)
+        except HasherBusy:
+            flash("⏳ Serveur très sollicité, réessayez dans quelques secondes.", "warning")
+            return render_template("login.html"), 503, {"Retry-After": "5"}
+
+        if valid and user.active:
+            if inspect(user).modified:
+                db.session.add(user)
+                db.session.commit()  # empreinte réhachée avec les paramètres actuels
             login_user(user)
             flash(f"Bienvenue {user.username} 👋", "success")
             return redirect(url_for("main.index"))
         else:
+            login_throttle.failed(username)
             flash("❌ Identifiants invalides ou compte inactif.", "danger")
 
     return render_template("login.html")
@@ -58,13 +79,16 @@ def change_password():
         old_pw = request.form.get("old_password")
         new_pw = request.form.get("new_password")
 
+        # current_user est un instantané (app.identity) : le compte est relu pour le modifier
+        user = db.session.get(User, current_user.id)
+
         # Vérifie l'ancien mot de passe
-        if not current_user.check_password(old_pw):
+        if not user.check_password(old_pw):
             flash("❌ Ancien mot de passe incorrect.", "danger")
         elif len(new_pw) < 6:
             flash("⚠️ Le nouveau mot de passe doit contenir au moins 6 caractères.", "warning")
         else:
-            current_user.set_password(new_pw)
+            user.set_password(new_pw)
             db.session.commit()
             flash("✅ Mot de passe administrateur mis à jour avec succès !", "success")
             return redirect(url_for("main.index"))
@@ -1,6 +1,16 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, abort, current_app
 from flask_login import login_required, current_user
-from app.models import Message, Room
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+from app.models import Message, Room, User
+from app.identity import identities
+from app.recent import message_dict, recent_messages
+from app.search import search_messages
+from app.retention import delete_room as schedule_room_deletion, describe_retention
+from app.sequences import room_sequences
+from app.unread import mark_room_read, note_new_message, rooms_with_unread
+from app.writer import message_writer
 from app import db
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/chat")
@@ -10,23 +20,17 @@ chat_bp = Blueprint("chat", __name__, url_prefix="/chat")
 @chat_bp.route("/")
 @login_required
 def room_list():
-    rooms = Room.query.order_by(Room.name.asc()).all()
+    # 🔔 Salons + compteurs de messages non lus (une requête agrégée, ou le cache)
+    rooms = rooms_with_unread(current_user.id)
 
     # Crée un salon "Général" s’il n’existe pas encore
     if not rooms:
         general = Room(name="Général")
         db.session.add(general)
         db.session.commit()
+        general.unread_count = 0
         rooms = [general]
 
-    # 🔔 Ajoute un compteur de messages non lus pour chaque salon
-    for room in rooms:
-        room.unread_count = (
-            Message.query.filter_by(room_id=room.id, is_read=False)
-            .filter(Message.user_id != current_user.id)
-            .count()
-        )
-
     return render_template("rooms.html", rooms=rooms)
 
 
@@ -74,6 +78,7 @@ def edit_room(room_id):
 
     room.name = new_name
     db.session.commit()
+    identities.invalidate_room(room.id)
     flash(f"✏️ Salon renommé en '{new_name}'", "info")
     return redirect(url_for("chat.room_list"))
 
@@ -91,9 +96,30 @@ def delete_room(room_id):
         flash("🚫 Impossible de supprimer le salon 'Général'.", "danger")
         return redirect(url_for("chat.room_list"))
 
-    db.session.delete(room)
+    # 🧹 Salon retiré tout de suite, messages effacés par lots en arrière-plan
+    name = room.name
+    schedule_room_deletion(room)
+    flash(f"🗑️ Salon '{name}' supprimé.", "success")
+    return redirect(url_for("chat.room_list"))
+
+
+# 🗄️ Durée de conservation des messages d’un salon (vide = valeur par défaut, 0 = illimitée)
+@chat_bp.route("/<int:room_id>/retention", methods=["POST"])
+@login_required
+def set_retention(room_id):
+    if current_user.role != "admin":
+        flash("⚠️ Seuls les administrateurs peuvent modifier un salon.", "warning")
+        return redirect(url_for("chat.room_list"))
+
+    room = Room.query.get_or_404(room_id)
+    days = request.form.get("days", "").strip()
+    if days and (not days.isdigit()):
+        flash("La durée de conservation doit être un nombre de jours.", "danger")
+        return redirect(url_for("chat.room_list"))
+
+    room.retention_days = int(days) if days else None
     db.session.commit()
-    flash(f"🗑️ Salon '{room.name}' supprimé.", "success")
+    flash(f"🗄️ Conservation des messages de '{room.name}' : {describe_retention(room)}.", "info")
     return redirect(url_for("chat.room_list"))
 
 
@@ -103,26 +129,159 @@ def delete_room(room_id):
 def chat(room_id):
     room = Room.query.get_or_404(room_id)
 
-    # 🟢 Marquer les messages du salon comme lus pour l’utilisateur courant
-    Message.query.filter_by(room_id=room.id, is_read=False).filter(
-        Message.user_id != current_user.id
-    ).update({"is_read": True})
-    db.session.commit()
+    # 📜 Seule la page la plus récente est rendue (depuis la mémoire si le salon
+    # est actif), le reste est chargé à la demande
+    page, next_cursor = recent_page(room.id)
 
-    messages = (
-        Message.query.filter_by(room_id=room.id)
-        .order_by(Message.timestamp.desc())
-        .all()
-    )
+    # 🟢 Marquer le salon comme lu pour l’utilisateur courant (un seul upsert)
+    if page:
+        mark_room_read(current_user.id, room.id, max(m["id"] for m in page))
+    messages = with_previews(reversed(page))
+
+    return render_template("chat_room.html", room=room, messages=messages, next_cursor=next_cursor)
+
+
+# 📜 Pages plus anciennes de l’historique (JSON, curseur sur (timestamp, id))
+@chat_bp.route("/<int:room_id>/history")
+@login_required
+def history(room_id):
+    room = Room.query.get_or_404(room_id)
+
+    before = request.args.get("before")
+    if before:
+        try:
+            before = decode_cursor(before)
+        except ValueError:
+            abort(400)
+
+    page, next_cursor = load_history(room.id, before=before)
+    return jsonify(messages=with_previews(m.to_dict() for m in page), next_cursor=next_cursor)
+
+
+def recent_page(room_id):
+    """Page la plus récente d’un salon (dicts, du plus récent au plus ancien) et curseur suivant.
+
+    Servie par le tampon de app.recent quand le salon y est ; sinon lue en
+    base, puis gardée en mémoire pour les vues suivantes.
+    """
+    limit = current_app.config["CHAT_PAGE_SIZE"]
+    cached = recent_messages.get(room_id, limit)
+    if cached is not None:
+        page, has_more = cached
+        return page, f"{page[-1]['ts']}_{page[-1]['id']}" if has_more else None
+
+    version = recent_messages.version(room_id)
+    rows, next_cursor = load_history(room_id, limit=limit)
+    page = [m.to_dict() for m in rows]
+    recent_messages.fill(room_id, page, next_cursor is not None, version)
+    return page, next_cursor
+
+
+def messages_after(room_id, seq):
+    """Messages d’un salon de seq supérieure à `seq` (ordre croissant), depuis la
+    mémoire si possible, sinon par l’index (room_id, seq).
+
+    None si plus de CATCH_UP_LIMIT messages ont été manqués (recharger la page).
+    """
+    limit = current_app.config["CATCH_UP_LIMIT"]
+    messages = recent_messages.after(room_id, seq)
+    if messages is None:
+        rows = (
+            Message.query.options(joinedload(Message.user))
+            .filter(Message.room_id == room_id, Message.seq > seq)
+            .order_by(Message.seq)
+            .limit(limit + 1)
+            .all()
+        )
+        messages = [m.to_dict() for m in rows]
+    if len(messages) > limit:
+        return None
+    return with_previews(messages)
+
+
+def with_previews(dicts):
+    """Copies des messages, avec l’aperçu réduit des fichiers quand il existe"""
+    messages = []
+    for data in dicts:
+        data = dict(data)  # les dicts du tampon mémoire sont partagés
+        data["preview_path"], data["preview_pending"] = previews.lookup(data["file_path"])
+        messages.append(data)
+    return messages
+
+
+# 🔎 Recherche plein texte (salon, auteur et période optionnels)
+@chat_bp.route("/search")
+@login_required
+def search():
+    terms = request.args.get("q", "").strip()
+    room_id = request.args.get("room_id", type=int)
+    author = request.args.get("author", "").strip()
+    since = request.args.get("since", type=parse_day)
+    until = request.args.get("until", type=parse_day)
+    before = request.args.get("before", type=int)
+    limit = current_app.config["CHAT_PAGE_SIZE"]
+
+    results = []
+    if terms:
+        user = User.query.filter_by(username=author).first() if author else None
+        if not author or user:
+            results = search_messages(
+                terms,
+                room_id=room_id,
+                user_id=user.id if user else None,
+                since=since,
+                until=until + timedelta(days=1) if until else None,  # jour de fin inclus
+                limit=limit,
+                before_id=before,
+            )
+    next_before = results[-1].id if len(results) == limit else None
+
+    if request.args.get("format") == "json":
+        return jsonify(messages=[m.to_dict() for m in results], next_before=next_before)
+    rooms = Room.query.order_by(Room.name.asc()).all()
+    return render_template("search.html", results=results, rooms=rooms, next_before=next_before)
+
+
+def parse_day(value):
+    """Date 'AAAA-MM-JJ' d’un formulaire (ValueError si invalide : l’argument est ignoré)"""
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def encode_cursor(msg):
+    """Curseur opaque '<timestamp ISO>_<id>' pointant sur un message"""
+    return f"{msg.timestamp.isoformat()}_{msg.id}"
+
+
+def decode_cursor(cursor):
+    """Inverse de encode_cursor (lève ValueError si le curseur est invalide)"""
+    ts, msg_id = cursor.rsplit("_", 1)
+    return datetime.fromisoformat(ts), int(msg_id)
+
+
+def load_history(room_id, before=None, limit=None):
+    """Renvoie une page de messages (du plus récent au plus ancien) et le curseur suivant.
+
+    La requête parcourt l’index (room_id, timestamp, id) : une page coûte le
+    même prix quelle que soit sa profondeur dans l’historique.
+    """
+    limit = limit or current_app.config["CHAT_PAGE_SIZE"]
+
+    query = Message.query.options(joinedload(Message.user)).filter(Message.room_id == room_id)
+    if before:
+        ts, msg_id = before
+        query = query.filter(
+            or_(Message.timestamp < ts, and_(Message.timestamp == ts, Message.id < msg_id))
+        )
 
-    return render_template("chat_room.html", room=room, messages=messages)
+    rows = query.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
 
 # ======================================================
 # 📎 Upload d’un fichier (image ou PDF) dans un salon
 # ======================================================
-import os
-from flask import current_app
-from werkzeug.utils import secure_filename
+from app.blobs import store_stream
+from app.previews import previews
 
 
 def allowed_file(filename):
@@ -146,20 +305,25 @@ def upload_file(room_id):
         flash("❌ Format de fichier non autorisé. (PDF, PNG, JPG, GIF uniquement)", "danger")
         return redirect(url_for("chat.chat", room_id=room_id))
 
-    # 🔒 Sauvegarde sécurisée
-    filename = secure_filename(file.filename)
-    save_path = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
-    file.save(save_path)
+    # 🔒 Rangement par empreinte : un contenu déjà connu n’est pas réécrit
+    file_path = store_stream(file.stream, file.filename.rsplit('.', 1)[1].lower())
 
     # 💾 Enregistrement du message dans la base
     msg = Message(
+        id=message_writer.reserve_id(),
+        seq=room_sequences.reserve(room_id),
         content=None,
         user_id=current_user.id,
         room_id=room_id,
-        file_path=f"uploads/{filename}"  # chemin relatif depuis /static/
+        file_path=file_path  # chemin relatif depuis /static/
     )
     db.session.add(msg)
     db.session.commit()
+    note_new_message(room_id, current_user.id)
+    recent_messages.push(message_dict(
+        msg.id, current_user.username, current_user.id, room_id, None, file_path, msg.timestamp, msg.seq
+    ))
+    previews.submit(file_path, room_id, msg.id)
 
     flash("✅ Fichier envoyé avec succès !", "success")
     return redirect(url_for("chat.chat", room_id=room_id))
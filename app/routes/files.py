@@ -0,0 +1,72 @@
+import mimetypes
+import os
+import re
+from flask import Blueprint, current_app, request, send_from_directory, url_for, Response, abort
+from werkzeug.security import safe_join
+from app.compression import compression
+
+files_bp = Blueprint("files", __name__)
+
+# Fichier rangé par empreinte (app.blobs) ou son aperçu : le contenu d’une URL ne change jamais
+BLOB_NAME = re.compile(r"^(previews/)?[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.[a-z0-9]+(\.jpg)?$")
+
+ONE_YEAR = 365 * 24 * 3600
+
+
+@files_bp.app_template_global()
+def upload_url(file_path):
+    """URL publique d’un Message.file_path ('uploads/...')"""
+    return url_for("files.upload", name=file_path.split("/", 1)[1])
+
+
+# ======================================================
+# 📎 Fichiers envoyés (images, PDF, aperçus)
+# ======================================================
+@files_bp.route("/uploads/<path:name>")
+def upload(name):
+    """Sert un fichier envoyé, avec ETag fort, requêtes Range et cache long.
+
+    - blobs : ETag = empreinte SHA-256 du contenu, Cache-Control immutable ;
+    - anciens fichiers (nom d’origine, contenu remplaçable) : revalidation à chaque vue.
+
+    Le corps part par wsgi.file_wrapper (sendfile sous gunicorn) ou, si
+    UPLOADS_ACCEL_REDIRECT est défini, est délégué à nginx (X-Accel-Redirect),
+    qui gère alors lui-même sendfile et les plages.
+    """
+    match = BLOB_NAME.match(name)
+    if match:
+        etag = match[2] + ("-preview" if match[1] else "")
+        max_age = ONE_YEAR
+    else:
+        etag, max_age = True, 0
+
+    accel = current_app.config["UPLOADS_ACCEL_REDIRECT"]
+    if accel:
+        path = safe_join(current_app.config["UPLOAD_FOLDER"], name)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        # nginx conserve le Content-Type de la réponse d’origine
+        response = Response(mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = accel.rstrip("/") + "/" + name
+        response.set_etag(etag if isinstance(etag, str) else f"{os.path.getmtime(path):.0f}-{os.path.getsize(path)}")
+        response.make_conditional(request)
+    else:
+        response = send_from_directory(
+            current_app.config["UPLOAD_FOLDER"], name, etag=etag, conditional=True, max_age=max_age
+        )
+
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if match:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+# 🧭 Service worker servi depuis la racine : sa portée couvre tout le site (pages et /uploads/)
+@files_bp.route("/service-worker.js")
+def service_worker():
+    response = compression.send_static("service-worker.js", max_age=0)
+    response.cache_control.no_cache = True
+    return response
@@ -1,18 +1,38 @@
-from flask import Blueprint, render_template
-from flask_login import login_required
-from app.models import User, Message
+import hmac
+from flask import Blueprint, Response, abort, current_app, render_template, request
+from flask_login import current_user, login_required
+from app.metrics import metrics
+from app.models import Message
+from app.stats import global_stats
 
 main_bp = Blueprint("main", __name__)
 
 @main_bp.route("/")
 @login_required
 def index():
-    total_users = User.query.count()
-    total_messages = Message.query.count()
+    stats = global_stats()
     latest_messages = Message.query.order_by(Message.timestamp.desc()).limit(5).all()
     return render_template(
         "dashboard.html",
-        total_users=total_users,
-        total_messages=total_messages,
+        total_users=stats["total_users"],
+        total_messages=stats["total_messages"],
         latest_messages=latest_messages
     )
+
+
+# 📈 Métriques au format Prometheus (scrape) : jeton METRICS_TOKEN en
+# "Authorization: Bearer ...", sinon accès local ou administrateur connecté.
+# Chaque worker expose ses propres séries (étiquette worker).
+@main_bp.route("/metrics")
+def prometheus_metrics():
+    token = current_app.config["METRICS_TOKEN"]
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        allowed = hmac.compare_digest(supplied.encode(), token.encode())
+    else:
+        allowed = request.remote_addr in ("127.0.0.1", "::1") or (
+            current_user.is_authenticated and current_user.role == "admin"
+        )
+    if not allowed:
+        abort(403)
+    return Response(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,62 @@
+import click
+from flask import current_app
+from flask.cli import ScriptInfo
+from sqlalchemy import inspect
+from app import db
+
+
+# ======================================================
+# 🧱 Schéma de la base : migrations et création explicite
+# ======================================================
+# create_app() ne touche plus au schéma (démarrage rapide des workers, pas de
+# concurrence avec Alembic). Flask-Migrate et Alembic (~170 ms d’import) ne
+# sont chargés que par les commandes qui s’en servent.
+def init_migrations(app):
+    """Branche Flask-Migrate sur l’application (une fois, au premier usage)"""
+    if "migrate" not in app.extensions:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+
+class MigrationsGroup(click.Group):
+    """« flask db ... » : le groupe de Flask-Migrate, importé quand on l’appelle"""
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        info = parent.find_object(ScriptInfo) if parent is not None else None
+        init_migrations(info.load_app() if info is not None else current_app._get_current_object())
+        from flask_migrate.cli import db as db_cli
+        return db_cli.make_context(info_name, args, parent=parent, **extra)
+
+
+def init_db(app):
+    """Prépare la base : "created", "upgraded" ou "unversioned".
+
+    - base vide : tables créées d’après les modèles (index plein texte compris),
+      puis marquées à la dernière révision Alembic ;
+    - base versionnée : migrations en attente appliquées (flask db upgrade) ;
+    - tables sans version Alembic : rien n’est fait, la révision est à
+      indiquer à la main (flask db stamp <révision>).
+    """
+    init_migrations(app)
+    from flask_migrate import stamp, upgrade
+    with app.app_context():
+        inspector = inspect(db.engine)
+        if inspector.has_table("alembic_version"):
+            upgrade()
+            return "upgraded"
+        if inspector.get_table_names():
+            return "unversioned"
+        db.create_all()
+        stamp()
+        return "created"
+
+
+@click.command("init-db")
+def init_db_command():
+    """Crée le schéma d’une base vide ou applique les migrations en attente."""
+    result = init_db(current_app._get_current_object())
+    if result == "unversioned":
+        raise click.ClickException(
+            "Tables présentes sans version Alembic : flask db stamp <révision> puis flask init-db"
+        )
+    click.echo("✔ Tables créées" if result == "created" else "✔ Base à jour")
@@ -0,0 +1,145 @@
+import re
+import time
+from flask.cli import AppGroup
+from sqlalchemy import DDL, event, text
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Message
+
+search_cli = AppGroup("search", help="Index de recherche plein texte des messages.")
+
+# ======================================================
+# 🔎 Index plein texte
+# ======================================================
+# SQLite : table FTS5 à contenu externe (le texte reste dans message, l’index
+# ne stocke que les listes de positions), tenue à jour par trigger à chaque
+# insertion, modification et suppression — y compris les écritures en masse
+# et le mode write-behind. room_id et user_id sont indexés comme des mots :
+# la portée salon / auteur est une intersection de listes, pas un filtre a posteriori.
+#
+# PostgreSQL : index GIN sur to_tsvector('simple', content), maintenu par la base.
+#
+# ⚠️ Une migration qui recrée la table message (batch_alter_table sous SQLite)
+# supprime ses triggers : `flask search rebuild` les recrée et réindexe.
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5("
+    "content, room_id, user_id, content='message', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS message_fts_insert AFTER INSERT ON message BEGIN "
+    "INSERT INTO message_fts (rowid, content, room_id, user_id) "
+    "VALUES (new.id, new.content, new.room_id, new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS message_fts_delete AFTER DELETE ON message BEGIN "
+    "INSERT INTO message_fts (message_fts, rowid, content, room_id, user_id) "
+    "VALUES ('delete', old.id, old.content, old.room_id, old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS message_fts_update AFTER UPDATE OF content, room_id, user_id ON message BEGIN "
+    "INSERT INTO message_fts (message_fts, rowid, content, room_id, user_id) "
+    "VALUES ('delete', old.id, old.content, old.room_id, old.user_id); "
+    "INSERT INTO message_fts (rowid, content, room_id, user_id) "
+    "VALUES (new.id, new.content, new.room_id, new.user_id); END",
+]
+
+POSTGRESQL_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_message_content_fts ON message "
+    "USING gin (to_tsvector('simple', coalesce(content, '')))",
+]
+
+# Bases créées par db.create_all() (développement) : l’index suit la table message
+for statement in SQLITE_DDL:
+    event.listen(Message.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRESQL_DDL:
+    event.listen(Message.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+
+def _fts_query(terms):
+    """Traduit la saisie en requête FTS5 : mots entre guillemets (ET implicite), 'mot*' = préfixe"""
+    words = re.findall(r"\w+\*?", terms)
+    return " ".join(f'"{w[:-1]}"*' if w.endswith("*") else f'"{w}"' for w in words)
+
+
+def search_messages(terms, room_id=None, user_id=None, since=None, until=None, limit=50, before_id=None):
+    """Messages contenant tous les mots de `terms`, du plus récent au plus ancien.
+
+    - room_id / user_id : portée salon / auteur
+    - since / until : bornes de date (datetime, until exclu)
+    - before_id : pagination (messages d’id inférieur)
+    """
+    dialect = db.session.get_bind().dialect.name
+    query = Message.query.options(joinedload(Message.user), joinedload(Message.room))
+
+    if dialect == "sqlite":
+        match = _fts_query(terms)
+        if not match:
+            return []
+        match = f"content : ({match})"
+        if room_id is not None:
+            match += f' AND room_id : "{int(room_id)}"'
+        if user_id is not None:
+            match += f' AND user_id : "{int(user_id)}"'
+
+        # FTS5 parcourt ses rowid en ordre décroissant sans tri : LIMIT arrête la lecture.
+        # La période devient un intervalle d’ids (deux lectures de l’index sur
+        # timestamp) que FTS5 sait parcourir seul ; les ids suivant l’ordre
+        # d’envoi, le filtre exact sur timestamp ne fait qu’écarter les bords.
+        sql = "SELECT message_fts.rowid FROM message_fts JOIN message ON message.id = message_fts.rowid WHERE message_fts MATCH :match"
+        bounds = {}
+        if since is not None:
+            bounds["lo"] = db.session.execute(text(
+                "SELECT id FROM message WHERE timestamp >= :since ORDER BY timestamp, id LIMIT 1"
+            ), {"since": since}).scalar()
+            sql += " AND message_fts.rowid >= :lo AND message.timestamp >= :since"
+        if until is not None:
+            bounds["hi"] = db.session.execute(text(
+                "SELECT id FROM message WHERE timestamp < :until ORDER BY timestamp DESC, id DESC LIMIT 1"
+            ), {"until": until}).scalar()
+            sql += " AND message_fts.rowid <= :hi AND message.timestamp < :until"
+        if None in bounds.values():
+            return []
+        if before_id:
+            sql += " AND message_fts.rowid < :before_id"
+        sql += " ORDER BY message_fts.rowid DESC LIMIT :limit"
+        params = {"match": match, "since": since, "until": until, "before_id": before_id, "limit": limit, **bounds}
+        ids = db.session.execute(text(sql), params).scalars().all()
+        if not ids:
+            return []
+        messages = {m.id: m for m in query.filter(Message.id.in_(ids))}
+        return [messages[i] for i in ids if i in messages]
+
+    # Expression identique à celle de l’index GIN (sinon il n’est pas utilisé)
+    query = query.filter(text(
+        "to_tsvector('simple', coalesce(message.content, '')) @@ plainto_tsquery('simple', :terms)"
+    ).bindparams(terms=terms))
+    if room_id is not None:
+        query = query.filter(Message.room_id == room_id)
+    if user_id is not None:
+        query = query.filter(Message.user_id == user_id)
+
+    if since is not None:
+        query = query.filter(Message.timestamp >= since)
+    if until is not None:
+        query = query.filter(Message.timestamp < until)
+    if before_id:
+        query = query.filter(Message.id < before_id)
+    return query.order_by(Message.id.desc()).limit(limit).all()
+
+
+def rebuild_index():
+    """Reconstruit l’index depuis la table message (données antérieures, dérive)"""
+    connection = db.session.connection()
+    if connection.dialect.name == "sqlite":
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO message_fts (message_fts) VALUES ('rebuild')"))
+        connection.execute(text("INSERT INTO message_fts (message_fts) VALUES ('optimize')"))
+    elif connection.dialect.name == "postgresql":
+        for statement in POSTGRESQL_DDL:
+            connection.execute(text(statement))
+        connection.execute(text("REINDEX INDEX ix_message_content_fts"))
+    db.session.commit()
+
+
+@search_cli.command("rebuild")
+def rebuild_command():
+    """Reconstruit l’index plein texte des messages."""
+    started = time.perf_counter()
+    rebuild_index()
+    print(f"✔ Index reconstruit en {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,71 @@
+import threading
+from sqlalchemy import event, text
+from app import db
+from app.models import Message
+
+
+class RoomSequences:
+    """Numéros de séquence des messages, strictement croissants dans chaque salon.
+
+    Room.last_seq est le dernier numéro attribué ; Message.seq ordonne les
+    événements du salon, et un client reconnecté demande "tout après seq X"
+    (index (room_id, seq)). Les numéros peuvent présenter des trous (blocs
+    non consommés, écritures échouées), jamais de retour en arrière.
+
+    - mode normal : l’insertion d’un message incrémente Room.last_seq dans la
+      même transaction (verrou de ligne sur le salon : ordre = ordre de validation) ;
+    - mode write-behind (un seul processus) : les numéros sont réservés en base
+      par blocs de ROOM_SEQ_BLOCK, comme les ids (cf. MessageWriter.reserve_id).
+    """
+
+    def __init__(self):
+        self.block = 0
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        from app.writer import message_writer
+
+        self.block = app.config["ROOM_SEQ_BLOCK"] if message_writer.enabled else 0
+        with self._lock:
+            self._blocks.clear()
+
+    def reserve(self, room_id):
+        """Réserve le prochain numéro du salon (None hors mode write-behind : attribué à l’insertion)"""
+        if not self.block:
+            return None
+        with self._lock:
+            next_seq, last = self._blocks.get(room_id, (1, 0))
+            if next_seq > last:
+                last = self._allocate(room_id, self.block)
+                if last is None:
+                    return None
+                next_seq = last - self.block + 1
+            self._blocks[room_id] = (next_seq + 1, last)
+            return next_seq
+
+    def forget(self, room_id):
+        """Abandonne le bloc en cours d’un salon supprimé (son id peut être réutilisé)"""
+        with self._lock:
+            self._blocks.pop(room_id, None)
+
+    def _allocate(self, room_id, count):
+        """Prend `count` numéros au salon, dans une transaction à part"""
+        with db.engine.begin() as connection:
+            return _bump(connection, room_id, count)
+
+
+def _bump(connection, room_id, count):
+    return connection.execute(
+        text("UPDATE room SET last_seq = last_seq + :n WHERE id = :room_id RETURNING last_seq"),
+        {"n": count, "room_id": room_id},
+    ).scalar()
+
+
+@event.listens_for(Message, "before_insert")
+def _assign_seq(mapper, connection, target):
+    if target.seq is None:
+        target.seq = _bump(connection, target.room_id, 1)
+
+
+room_sequences = RoomSequences()
@@ -1,107 +1,367 @@
-from flask_socketio import emit, join_room, leave_room
+from flask_socketio import join_room, leave_room
 from flask_login import current_user
 from app import socketio, db
-from app.models import Message, Room
+from app.models import Message
+from app.identity import identities
+from app.unread import note_new_message
+from app.writer import message_writer
+from app.metrics import metrics
+from app.instrumentation import instrumentation
+from app.presence import presence, worker_id
+from app.blobs import store_bytes, store_file
+from app.previews import previews
+from app.recent import message_dict, recent_messages
+from app.routes.chat import messages_after
+from app.sequences import room_sequences
+from app.uploads import UploadError, abort_upload, finish_upload, get_upload, start_upload
+from app.wire import wire_formats
 from datetime import datetime
-import os
+import json
+import logging
+import time
 from werkzeug.utils import secure_filename
-from flask import current_app
-
-# Liste des utilisateurs connectés
-online_users = set()
+from flask import current_app, request
 
+logger = logging.getLogger(__name__)
 
 # ✅ Connexion d’un utilisateur
 @socketio.on("connect")
-def handle_connect():
+@instrumentation.event("connect")
+def handle_connect(auth=None):
     if not current_user.is_authenticated:
         return
-    online_users.add(current_user.username)
-    emit("update_user_list", sorted(list(online_users)), broadcast=True)
-    emit("system_message", {"text": f"✅ {current_user.username} s’est connecté"}, broadcast=True)
+    # 🪪 Compte retenu pour toute la connexion : les événements suivants ne le relisent pas
+    identities.connect(request.sid, current_user.id)
+    # 🗜️ Format des messages annoncé par le client (auth.wire), sinon clés complètes
+    wire_formats.negotiate(request.sid, auth)
+    # 👥 Arrivée annoncée par "presence_delta" (regroupé, hors de ce handler)
+    presence.connect(request.sid, current_user.id, current_user.username)
 
 
 # 🚪 Déconnexion
+# La diffusion du départ part plus tard, en tâche de fond : un socket mort découvert
+# pendant l’envoi déclencherait sinon la déconnexion suivante en cascade (récursion)
 @socketio.on("disconnect")
-def handle_disconnect():
-    if not current_user.is_authenticated:
-        return
-    if current_user.username in online_users:
-        online_users.remove(current_user.username)
-        emit("update_user_list", sorted(list(online_users)), broadcast=True)
-        emit("system_message", {"text": f"❌ {current_user.username} s’est déconnecté"}, broadcast=True)
+@instrumentation.event("disconnect")
+def handle_disconnect(reason=None):
+    identities.disconnect(request.sid)
+    wire_formats.forget(request.sid)
+    presence.disconnect(request.sid)
+
+
+def connection_user():
+    """Compte de la connexion courante (UserIdentity en cache), None si non authentifiée"""
+    return identities.for_sid(request.sid)
+
+
+# 👥 Liste complète des connectés, à la demande (puis "presence_delta" la tient à jour)
+@socketio.on("presence_snapshot")
+@instrumentation.event("presence_snapshot")
+def handle_presence_snapshot(data=None):
+    if connection_user() is None:
+        return {"ok": False, "error": "Non connecté"}
+    return {"ok": True, "users": presence.snapshot()}
+
+
+# 📡 Diffusion limitée aux membres d’un salon
+def parse_room_id(data):
+    """Id de salon envoyé par le client ({"room_id": ...}), ou None s’il est invalide"""
+    value = data.get("room_id") if isinstance(data, dict) else None
+    if isinstance(value, bool):
+        return None
+    try:
+        room_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return room_id if room_id > 0 else None
+
+
+def room_channel(room_id):
+    """Nom du salon Socket.IO associé à un salon de discussion (id déjà validé)"""
+    return f"room-{room_id}"
+
+
+def message_channel(room_id, compact):
+    """Canal des messages du salon pour un format (compact ou clés complètes)"""
+    return f"{room_channel(room_id)}.{'c' if compact else 'j'}"
+
+
+def broadcast_to_room(event, payload, room_id):
+    """Émet un message aux seuls clients ayant rejoint le salon, une fois par format,
+    et mesure le fan-out.
+
+    Les destinataires ne sont connus que localement : en multi-workers, chaque
+    série est étiquetée par worker et ne compte que les clients du worker émetteur
+    (et les deux formats sont toujours émis : d’autres workers peuvent en avoir).
+    """
+    everywhere = bool(current_app.config["SOCKETIO_MESSAGE_QUEUE"])
+    for compact in (True, False):
+        channel = message_channel(room_id, compact)
+        recipients = sum(1 for _ in socketio.server.manager.get_participants("/", channel))
+        if not recipients and not everywhere:
+            continue
+        body = wire_formats.encode(payload, compact)
+        started = time.perf_counter()
+        socketio.emit(event, body, to=channel, namespace="/")
+        elapsed = time.perf_counter() - started
+
+        size = len(json.dumps(body, separators=(",", ":")))
+        labels = {"event": event, "format": "compact" if compact else "json", "worker": worker_id()}
+        metrics.inc("socketio_fanout_events_total", **labels)
+        metrics.inc("socketio_fanout_recipients_total", recipients, **labels)
+        metrics.inc("socketio_fanout_bytes_total", size * recipients, **labels)
+        metrics.observe("socketio_emit_seconds", elapsed, **labels)
 
 
 # 📥 Rejoindre / quitter un salon
 @socketio.on("join_room")
+@instrumentation.event("join_room")
 def handle_join(data):
-    join_room(data["room_id"])
+    room_id = parse_room_id(data)
+    if room_id is None:
+        return {"ok": False, "error": "Salon invalide"}
+    join_room(room_channel(room_id))
+    join_room(message_channel(room_id, wire_formats.compact(request.sid)))
+    return {"ok": True}
 
 @socketio.on("leave_room")
+@instrumentation.event("leave_room")
 def handle_leave(data):
-    leave_room(data["room_id"])
+    room_id = parse_room_id(data)
+    if room_id is None:
+        return {"ok": False, "error": "Salon invalide"}
+    leave_room(room_channel(room_id))
+    leave_room(message_channel(room_id, wire_formats.compact(request.sid)))
+    return {"ok": True}
+
+
+# 🔁 Rattrapage après reconnexion : messages du salon de seq supérieure à "after"
+# (depuis la mémoire si possible) ; "reset" si trop nombreux, le client recharge la page
+@socketio.on("catch_up")
+@instrumentation.event("catch_up")
+def handle_catch_up(data):
+    room_id = parse_room_id(data)
+    after = data.get("after") if isinstance(data, dict) else None
+    if room_id is None or identities.room(room_id) is None:
+        return {"ok": False, "error": "Salon introuvable"}
+    if not isinstance(after, int) or isinstance(after, bool) or after < 0:
+        return {"ok": False, "error": "Séquence invalide"}
+    messages = messages_after(room_id, after)
+    if messages is None:
+        return {"ok": True, "reset": True}
+    return {"ok": True, "messages": messages}
 
 
 # 💬 Envoi d’un message texte
+# L’accusé de réception Socket.IO renvoie {"ok": bool, "id": ...} à l’émetteur.
 @socketio.on("send_message")
+@instrumentation.event("send_message")
 def handle_send_message(data):
-    room = Room.query.get(data["room_id"])
+    user = connection_user()
+    if user is None:
+        return {"ok": False, "error": "Non connecté"}
+    room_id = parse_room_id(data)
+    room = identities.room(room_id) if room_id else None
     if not room:
-        return
+        return {"ok": False, "error": "Salon introuvable"}
+    if not isinstance(data.get("content"), str) or not data["content"].strip():
+        return {"ok": False, "error": "Message vide"}
 
-    msg = Message(
-        content=data["content"],
-        user_id=current_user.id,
-        room_id=room.id,
-        is_read=False
-    )
-    db.session.add(msg)
-    db.session.commit()
+    timestamp = datetime.utcnow()
+    if message_writer.enabled:
+        # ✍️ Diffusion immédiate, écriture par lots en arrière-plan ("message_saved" suivra)
+        msg_id = message_writer.reserve_id()
+        seq = room_sequences.reserve(room.id)
+        accepted = message_writer.submit({
+            "id": msg_id,
+            "seq": seq,
+            "content": data["content"],
+            "user_id": user.id,
+            "room_id": room.id,
+            "timestamp": timestamp,
+        }, sid=request.sid)
+        if not accepted:
+            return {"ok": False, "error": "Serveur saturé, réessayez"}
+    else:
+        msg = Message(
+            content=data["content"],
+            user_id=user.id,
+            room_id=room.id,
+            timestamp=timestamp
+        )
+        db.session.add(msg)
+        try:
+            db.session.flush()
+            msg_id, seq = msg.id, msg.seq  # lus avant le commit (qui les expirerait)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception("Échec de l’enregistrement du message")
+            return {"ok": False, "error": "Message non enregistré"}
+
+    note_new_message(room.id, user.id)
+    recent_messages.push(message_dict(
+        msg_id, user.username, user.id, room.id, data["content"], None, timestamp, seq
+    ))
 
-    emit("receive_message", {
-        "user": current_user.username,
+    broadcast_to_room("receive_message", {
+        "id": msg_id,
+        "seq": seq,
+        "user": user.username,
         "content": data["content"],
-        "timestamp": datetime.utcnow().strftime("%d/%m %H:%M"),
+        "timestamp": timestamp,
         "room_id": room.id,
-        "user_id": current_user.id
-    }, broadcast=True)
+        "user_id": user.id
+    }, room.id)
+    return {"ok": True, "id": msg_id}
 
 
-# 📎 Envoi d’un fichier via Socket.IO (optionnel mais cool)
-@socketio.on("send_file")
-def handle_send_file(data):
-    """Réception d’un fichier (base64) envoyé par le client"""
-    import base64
+# 📎 Envoi d’un fichier via Socket.IO, par morceaux binaires (reprise possible)
+# upload_start → {"upload_id", "offset", "chunk_size"} ; upload_chunk (offset + octets)
+# → {"offset"} ; upload_finish → vérification taille / SHA-256 puis message.
+@socketio.on("upload_start")
+@instrumentation.event("upload_start")
+def handle_upload_start(data):
+    user = connection_user()
+    if user is None:
+        return {"ok": False, "error": "Non connecté"}
+    room_id = parse_room_id(data)
+    if room_id is None or identities.room(room_id) is None:
+        return {"ok": False, "error": "Salon introuvable"}
+    try:
+        upload = start_upload(
+            user.id, room_id,
+            filename=data.get("filename"),
+            size=data.get("size"),
+            checksum=data.get("sha256"),
+            upload_id=data.get("upload_id"),
+        )
+    except UploadError as exc:
+        return {"ok": False, "error": str(exc)}
+    return {
+        "ok": True,
+        "upload_id": upload.upload_id,
+        "offset": upload.offset,
+        "chunk_size": current_app.config["UPLOAD_CHUNK_SIZE"],
+    }
 
-    file_data = data.get("file_data")
-    filename = secure_filename(data.get("filename"))
-    room_id = data.get("room_id")
 
-    # 🔒 Vérifie les extensions autorisées
-    ext = filename.rsplit('.', 1)[-1].lower()
-    if ext not in current_app.config["ALLOWED_EXTENSIONS"]:
-        return
+@socketio.on("upload_chunk")
+@instrumentation.event("upload_chunk")
+def handle_upload_chunk(data):
+    user = connection_user()
+    upload = get_upload(data.get("upload_id"), user.id) if user and isinstance(data, dict) else None
+    if upload is None:
+        return {"ok": False, "error": "Envoi inconnu ou expiré"}
+    chunk = data.get("data")
+    if not isinstance(chunk, bytes) or len(chunk) > current_app.config["UPLOAD_CHUNK_SIZE"]:
+        return {"ok": False, "error": "Morceau invalide", "offset": upload.offset}
+    try:
+        offset = upload.write(data.get("offset"), chunk)
+    except UploadError as exc:
+        return {"ok": False, "error": str(exc), "offset": upload.offset}
+    return {"ok": True, "offset": offset}
 
-    # 📂 Sauvegarde du fichier
-    save_path = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
-    with open(save_path, "wb") as f:
-        f.write(base64.b64decode(file_data))
 
-    # 💾 Enregistre le message
+@socketio.on("upload_finish")
+@instrumentation.event("upload_finish")
+def handle_upload_finish(data):
+    user = connection_user()
+    upload = get_upload(data.get("upload_id"), user.id) if user and isinstance(data, dict) else None
+    if upload is None:
+        return {"ok": False, "error": "Envoi inconnu ou expiré"}
+    try:
+        path, digest = finish_upload(upload)
+    except UploadError as exc:
+        # Fichier complet mais corrompu : inutile de le garder ; sinon l’envoi reste reprenable
+        if upload.offset == upload.size:
+            abort_upload(upload)
+        return {"ok": False, "error": str(exc), "offset": upload.offset}
+
+    file_path = store_file(path, digest, upload.ext)
+    msg_id = publish_file(user, upload.room_id, file_path, upload.ext)
+    return {"ok": True, "id": msg_id}
+
+
+@socketio.on("upload_abort")
+@instrumentation.event("upload_abort")
+def handle_upload_abort(data):
+    user = connection_user()
+    upload = get_upload(data.get("upload_id"), user.id) if user and isinstance(data, dict) else None
+    if upload is not None:
+        abort_upload(upload)
+    return {"ok": True}
+
+
+def publish_file(user, room_id, file_path, ext):
+    """Enregistre le message d’un fichier reçu et le diffuse aux membres du salon"""
+    timestamp = datetime.utcnow()
     msg = Message(
+        id=message_writer.reserve_id(),
+        seq=room_sequences.reserve(room_id),
         content=None,
-        user_id=current_user.id,
+        user_id=user.id,
         room_id=room_id,
-        file_path=f"uploads/{filename}"
+        file_path=file_path,
+        timestamp=timestamp
     )
     db.session.add(msg)
+    db.session.flush()
+    msg_id, seq = msg.id, msg.seq  # lus avant le commit (qui les expirerait)
     db.session.commit()
+    note_new_message(room_id, user.id)
+    recent_messages.push(message_dict(
+        msg_id, user.username, user.id, room_id, None, file_path, timestamp, seq
+    ))
 
-    # 📡 Diffuse à tous
-    emit("receive_file", {
-        "user": current_user.username,
+    # 🖼️ Aperçu réduit : déjà connu (même contenu), ou annoncé plus tard par "file_preview"
+    preview_path = previews.existing(file_path)
+    preview_pending = preview_path is None and previews.supports(file_path)
+    broadcast_to_room("receive_file", {
+        "id": msg_id,
+        "seq": seq,
+        "user": user.username,
         "room_id": room_id,
-        "timestamp": datetime.utcnow().strftime("%d/%m %H:%M"),
-        "file_path": f"uploads/{filename}",
+        "timestamp": timestamp,
+        "file_path": file_path,
+        "preview_path": preview_path,
+        "preview_pending": preview_pending,
         "ext": ext
-    }, broadcast=True)
+    }, room_id)
+    if preview_pending:
+        # Demandé après la diffusion : "file_preview" ne peut pas précéder "receive_file"
+        previews.submit(file_path, room_id, msg_id)
+    return msg_id
+
+
+# 📎 Ancien envoi en un seul bloc base64 (clients non mis à jour)
+@socketio.on("send_file")
+@instrumentation.event("send_file")
+def handle_send_file(data):
+    """Réception d’un fichier (base64) envoyé par le client"""
+    import base64
+
+    user = connection_user()
+    if user is None:
+        return {"ok": False, "error": "Non connecté"}
+    room_id = parse_room_id(data)
+    if room_id is None or identities.room(room_id) is None:
+        return {"ok": False, "error": "Salon introuvable"}
+
+    file_data = data.get("file_data")
+    filename = secure_filename(data.get("filename") or "")
+
+    # 🔒 Vérifie les extensions autorisées
+    ext = filename.rsplit('.', 1)[-1].lower()
+    if "." not in filename or ext not in current_app.config["ALLOWED_EXTENSIONS"] or not file_data:
+        return {"ok": False, "error": "Fichier refusé"}
+
+    try:
+        content = base64.b64decode(file_data, validate=True)
+    except (TypeError, ValueError):
+        return {"ok": False, "error": "Fichier illisible"}
+
+    # 📂 Rangement par empreinte (aucune écriture si le contenu est déjà connu)
+    file_path = store_bytes(content, ext)
+    msg_id = publish_file(user, room_id, file_path, ext)
+    return {"ok": True, "id": msg_id}
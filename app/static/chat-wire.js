@@ -0,0 +1,17 @@
+// 🗜️ Format compact des messages Socket.IO (app/wire.py)
+// Annoncé à la connexion : io({auth: {wire: WIRE_VERSION}}). Le serveur envoie
+// alors des codes courts, sans champ vide, et l’heure en secondes UTC :
+// decodeWire() rend la forme complète, l’heure formatée à l’heure locale.
+const WIRE_VERSION = 1;
+const WIRE_KEYS = {
+  i: 'id', s: 'seq', u: 'user', w: 'user_id', r: 'room_id', c: 'content', t: 'timestamp',
+  f: 'file_path', p: 'preview_path', g: 'preview_pending', e: 'ext'
+};
+const wireTime = new Intl.DateTimeFormat('fr-FR', {day: '2-digit', month: '2-digit', hour: '2-digit', minute: '2-digit'});
+
+function decodeWire(data){
+  const message = {content: null, file_path: null, preview_path: null, preview_pending: false};
+  for(const [key, value] of Object.entries(data)) message[WIRE_KEYS[key] || key] = value;
+  if(typeof message.timestamp === 'number') message.timestamp = wireTime.format(new Date(message.timestamp * 1000));
+  return message;
+}
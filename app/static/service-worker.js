@@ -1,10 +1,17 @@
 // ✅ Nom du cache (tu peux changer la version si tu modifies ce fichier)
-const CACHE_NAME = "association-chat-v1";
+const CACHE_NAME = "association-chat-v3";
+
+// ✅ Fichiers envoyés rangés par empreinte : leur contenu ne change jamais,
+// ils sont gardés d’une version à l’autre (effacés seulement au-delà de UPLOADS_CACHE_MAX)
+const UPLOADS_CACHE = "association-chat-uploads";
+const UPLOADS_CACHE_MAX = 500;
+const IMMUTABLE_UPLOAD = /^\/uploads\/(previews\/)?[0-9a-f]{2}\/[0-9a-f]{2}\/[0-9a-f]{64}\./;
 
 // ✅ Liste des fichiers essentiels à mettre en cache
 const URLS_TO_CACHE = [
   "/",
   "/static/style.css",
+  "/static/chat-wire.js",
   "/static/manifest.json"
 ];
 
@@ -23,18 +30,38 @@ self.addEventListener("activate", event => {
   event.waitUntil(
     caches.keys().then(keys => {
       return Promise.all(
-        keys.filter(key => key !== CACHE_NAME)
+        keys.filter(key => key !== CACHE_NAME && key !== UPLOADS_CACHE)
             .map(key => caches.delete(key))
       );
     })
   );
 });
 
-// ✅ Interception des requêtes : on sert depuis le cache si possible
+// ✅ Fichier envoyé : servi depuis le cache, téléchargé une seule fois.
+// Les requêtes Range (lecture partielle d’un gros PDF) vont au réseau.
+async function cachedUpload(request){
+  const cache = await caches.open(UPLOADS_CACHE);
+  const cached = await cache.match(request);
+  if(cached) return cached;
+  const response = await fetch(request);
+  if(response.status === 200){
+    await cache.put(request, response.clone());
+    const keys = await cache.keys();
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - UPLOADS_CACHE_MAX)).map(key => cache.delete(key)));
+  }
+  return response;
+}
+
+// ✅ Interception des requêtes : réseau d’abord, cache en secours (hors ligne)
 self.addEventListener("fetch", event => {
+  if(event.request.method !== "GET") return;
+  const url = new URL(event.request.url);
+  if(url.origin === location.origin && IMMUTABLE_UPLOAD.test(url.pathname) && !event.request.headers.has("range")){
+    event.respondWith(cachedUpload(event.request));
+    return;
+  }
   event.respondWith(
-    caches.match(event.request)
-      .then(response => response || fetch(event.request))
-      .catch(() => caches.match("/"))
+    fetch(event.request)
+      .catch(() => caches.match(event.request).then(response => response || caches.match("/")))
   );
 });
@@ -0,0 +1,221 @@
+import logging
+import time
+from collections import Counter
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, event, text
+from sqlalchemy.orm import Session, object_session
+from app import db, socketio
+from app.cache import TTLCache
+from app.models import Message, MessageCounter, Room, User
+
+logger = logging.getLogger(__name__)
+
+stats_cli = AppGroup("stats", help="Statistiques matérialisées des messages.")
+
+# 📊 Résultats des tableaux de bord, servis depuis la mémoire pendant STATS_CACHE_TTL
+_stats_cache = None
+
+
+def _cache():
+    global _stats_cache
+    if _stats_cache is None:
+        _stats_cache = TTLCache(maxsize=8, ttl=current_app.config["STATS_CACHE_TTL"])
+    return _stats_cache
+
+
+# ======================================================
+# ⚙️ Maintenance incrémentale des compteurs
+# ======================================================
+# Le total global n’a pas de ligne propre (elle sérialiserait toutes les
+# écritures) : c’est la somme des compteurs de salons.
+def _dialect_insert(dialect):
+    if dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert
+
+
+def apply_deltas(connection, deltas):
+    """Applique {(scope, key): delta} en un seul upsert (ordre stable : pas d’interblocage)"""
+    counters = MessageCounter.__table__
+    rows = [
+        {"scope": scope, "key": key, "value": delta}
+        for (scope, key), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+
+    insert = _dialect_insert(connection.dialect)
+    if insert is not None:
+        stmt = insert(counters)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[counters.c.scope, counters.c.key],
+            set_={"value": counters.c.value + stmt.excluded.value},
+        )
+        connection.execute(stmt, rows)
+        return
+
+    for row in rows:
+        result = connection.execute(
+            counters.update()
+            .where(and_(counters.c.scope == row["scope"], counters.c.key == row["key"]))
+            .values(value=counters.c.value + row["value"])
+        )
+        if result.rowcount == 0:
+            connection.execute(counters.insert().values(**row))
+
+
+def apply_message_delta(connection, room_id, user_id, delta):
+    """Répercute l’ajout (delta > 0) ou la suppression (delta < 0) de messages"""
+    apply_deltas(connection, {("room", room_id): delta, ("user", user_id): delta})
+
+
+def _record(target, delta):
+    pending = object_session(target).info.setdefault("message_deltas", Counter())
+    pending[("room", target.room_id)] += delta
+    pending[("user", target.user_id)] += delta
+
+
+# Les événements ne font qu’accumuler ; les compteurs sont écrits une fois par flush.
+# Les suppressions en masse (Query.delete) ne les déclenchent pas : elles
+# doivent appeler apply_message_delta elles-mêmes.
+@event.listens_for(Message, "after_insert")
+def _on_message_insert(mapper, connection, target):
+    _record(target, 1)
+
+
+@event.listens_for(Message, "after_delete")
+def _on_message_delete(mapper, connection, target):
+    _record(target, -1)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_pending_deltas(session, flush_context):
+    deltas = session.info.pop("message_deltas", None)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_deltas(session):
+    session.info.pop("message_deltas", None)
+
+
+# ======================================================
+# 🔁 Réconciliation (recalcul complet depuis la table message)
+# ======================================================
+def reconcile_counters():
+    """Recalcule tous les compteurs et corrige les dérives éventuelles.
+
+    Tout se fait dans une transaction qui bloque les écritures de messages :
+    aucun incrément ne peut se glisser entre le comptage et la réécriture.
+    """
+    counters = MessageCounter.__table__
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(text("LOCK TABLE message IN SHARE MODE"))
+    # SQLite : la suppression prend le verrou d’écriture avant les lectures
+    db.session.execute(counters.delete())
+
+    rows = [
+        {"scope": "room", "key": room_id, "value": count}
+        for room_id, count in db.session.query(Message.room_id, db.func.count(Message.id)).group_by(Message.room_id)
+    ]
+    rows += [
+        {"scope": "user", "key": user_id, "value": count}
+        for user_id, count in db.session.query(Message.user_id, db.func.count(Message.id)).group_by(Message.user_id)
+    ]
+    if rows:
+        db.session.execute(counters.insert(), rows)
+    db.session.commit()
+    _cache().clear()
+    return len(rows)
+
+
+def start_reconciler(app):
+    """Lance la réconciliation périodique (STATS_RECONCILE_INTERVAL secondes, 0 = désactivée)"""
+    interval = app.config["STATS_RECONCILE_INTERVAL"]
+    if not interval:
+        return
+
+    def run():
+        while True:
+            socketio.sleep(interval)
+            with app.app_context():
+                try:
+                    reconcile_counters()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Échec de la réconciliation des compteurs")
+
+    socketio.start_background_task(run)
+
+
+@stats_cli.command("reconcile")
+def reconcile_command():
+    """Recalcule les compteurs de messages."""
+    started = time.perf_counter()
+    count = reconcile_counters()
+    print(f"✔ {count} compteurs recalculés en {time.perf_counter() - started:.2f}s")
+
+
+# ======================================================
+# 📈 Lecture (via le cache TTL)
+# ======================================================
+def _total_messages():
+    value = (
+        db.session.query(db.func.sum(MessageCounter.value))
+        .filter_by(scope="room")
+        .scalar()
+    )
+    return value or 0
+
+
+def global_stats():
+    """Totaux affichés sur la page d’accueil"""
+    stats = _cache().get("global")
+    if stats is None:
+        stats = {
+            "total_users": User.query.count(),
+            "total_rooms": Room.query.count(),
+            "total_messages": _total_messages(),
+        }
+        _cache().set("global", stats)
+    return stats
+
+
+def dashboard_stats():
+    """Statistiques du tableau de bord administrateur"""
+    stats = _cache().get("dashboard")
+    if stats is None:
+        room_stats = (
+            db.session.query(Room.id, Room.name, db.func.coalesce(MessageCounter.value, 0))
+            .outerjoin(
+                MessageCounter,
+                and_(MessageCounter.scope == "room", MessageCounter.key == Room.id),
+            )
+            .order_by(Room.name.asc())
+            .all()
+        )
+        top_users = (
+            db.session.query(User.username, MessageCounter.value.label("count"))
+            .join(
+                MessageCounter,
+                and_(MessageCounter.scope == "user", MessageCounter.key == User.id),
+            )
+            .filter(MessageCounter.value > 0)
+            .order_by(MessageCounter.value.desc())
+            .limit(5)
+            .all()
+        )
+        stats = dict(
+            global_stats(),
+            room_stats=[{"id": room_id, "name": name, "count": count} for room_id, name, count in room_stats],
+            top_users=[{"username": username, "count": count} for username, count in top_users],
+        )
+        _cache().set("dashboard", stats)
+    return stats
@@ -0,0 +1,110 @@
+from flask import current_app
+from sqlalchemy import and_
+from app import db
+from app.cache import TTLCache
+from app.models import Message, ReadReceipt, Room
+
+# 🔔 Compteurs de non-lus par utilisateur : {user_id: {room_id: count}}
+_counts_cache = None
+
+
+def _cache():
+    global _counts_cache
+    if _counts_cache is None:
+        _counts_cache = TTLCache(
+            maxsize=current_app.config["UNREAD_CACHE_SIZE"],
+            ttl=current_app.config["UNREAD_CACHE_TTL"],
+        )
+    return _counts_cache
+
+
+def mark_room_read(user_id, room_id, last_message_id):
+    """Avance le curseur de lecture d’un utilisateur dans un salon.
+
+    Un seul upsert par ouverture de salon, quel que soit le nombre de messages
+    non lus. Le curseur ne recule jamais.
+    """
+    if not last_message_id:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        insert = None
+
+    if insert is None:
+        receipt = db.session.get(ReadReceipt, (user_id, room_id))
+        if receipt is None:
+            db.session.add(ReadReceipt(user_id=user_id, room_id=room_id, last_read_id=last_message_id))
+        elif receipt.last_read_id < last_message_id:
+            receipt.last_read_id = last_message_id
+    else:
+        stmt = insert(ReadReceipt).values(user_id=user_id, room_id=room_id, last_read_id=last_message_id)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ReadReceipt.user_id, ReadReceipt.room_id],
+            set_={"last_read_id": stmt.excluded.last_read_id},
+            where=ReadReceipt.last_read_id < stmt.excluded.last_read_id,
+        )
+        db.session.execute(stmt)
+    db.session.commit()
+
+    cache = _cache()
+    with cache.lock:
+        counts = cache.get(user_id)
+        if counts is not None:
+            counts.pop(room_id, None)
+
+
+def note_new_message(room_id, author_id):
+    """Incrémente les compteurs en cache de tous les lecteurs d’un salon sauf l’auteur"""
+    cache = _cache()
+    with cache.lock:
+        for user_id, counts in cache.items():
+            if user_id != author_id:
+                counts[room_id] = counts.get(room_id, 0) + 1
+
+
+def rooms_with_unread(user_id):
+    """Liste des salons (triés par nom) avec leur attribut unread_count.
+
+    Si les compteurs de l’utilisateur sont en cache, seule la table des salons
+    est lue. Sinon salons et compteurs viennent d’une seule requête agrégée.
+    """
+    counts = _cache().get(user_id)
+    if counts is not None:
+        rooms = Room.query.order_by(Room.name.asc()).all()
+    else:
+        rows = (
+            _unread_query(user_id, db.session.query(Room, db.func.count(Message.id)))
+            .order_by(Room.name.asc())
+            .all()
+        )
+        rooms = [room for room, _ in rows]
+        counts = {room.id: count for room, count in rows if count}
+        _cache().set(user_id, counts)
+
+    for room in rooms:
+        room.unread_count = counts.get(room.id, 0)
+    return rooms
+
+
+def _unread_query(user_id, query):
+    """Joint salons, curseurs de lecture et messages non lus, groupés par salon"""
+    return (
+        query.outerjoin(
+            ReadReceipt,
+            and_(ReadReceipt.room_id == Room.id, ReadReceipt.user_id == user_id),
+        )
+        .outerjoin(
+            Message,
+            and_(
+                Message.room_id == Room.id,
+                Message.id > db.func.coalesce(ReadReceipt.last_read_id, 0),
+                Message.user_id != user_id,
+            ),
+        )
+        .group_by(Room.id)
+    )
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+
+class UploadError(ValueError):
+    """Envoi refusé ; le message est renvoyé tel quel au client"""
+
+
+class ChunkedUpload:
+    """Envoi de fichier en cours, reçu par morceaux dans un fichier temporaire.
+
+    Les métadonnées sont écrites à côté du fichier partiel (<id>.json) : l’envoi
+    peut reprendre après une reconnexion, y compris sur un autre worker.
+    """
+
+    def __init__(self, upload_id, user_id, room_id, filename, size, checksum=None):
+        self.upload_id = upload_id
+        self.user_id = user_id
+        self.room_id = room_id
+        self.filename = filename
+        self.size = size
+        self.checksum = checksum
+        self.offset = 0
+        self.lock = threading.Lock()
+        self._hasher = hashlib.sha256()
+
+    @property
+    def part_path(self):
+        return _tmp_path(f"{self.upload_id}.part")
+
+    @property
+    def meta_path(self):
+        return _tmp_path(f"{self.upload_id}.json")
+
+    @property
+    def ext(self):
+        return self.filename.rsplit(".", 1)[-1].lower()
+
+    def save_meta(self):
+        with open(self.meta_path, "w") as f:
+            json.dump({
+                "user_id": self.user_id,
+                "room_id": self.room_id,
+                "filename": self.filename,
+                "size": self.size,
+                "checksum": self.checksum,
+            }, f)
+
+    @classmethod
+    def load(cls, upload_id):
+        """Recharge un envoi interrompu : l’empreinte est recalculée sur la partie déjà reçue"""
+        try:
+            with open(_tmp_path(f"{upload_id}.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        upload = cls(upload_id, **meta)
+        upload._resync()
+        return upload
+
+    def _resync(self):
+        """Relit la partie reçue (reprise, ou morceaux écrits par un autre worker)"""
+        self._hasher = hashlib.sha256()
+        self.offset = 0
+        with open(self.part_path, "ab+") as f:
+            f.seek(0)
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                self._hasher.update(block)
+                self.offset += len(block)
+
+    def write(self, offset, data):
+        """Ajoute un morceau ; l’offset doit correspondre à la taille déjà reçue"""
+        with self.lock:
+            if os.path.getsize(self.part_path) != self.offset:
+                self._resync()
+            if offset != self.offset:
+                raise UploadError(f"Offset attendu : {self.offset}")
+            if self.offset + len(data) > self.size:
+                raise UploadError("Le fichier dépasse la taille annoncée")
+            with open(self.part_path, "ab") as f:
+                f.write(data)
+            self._hasher.update(data)
+            self.offset += len(data)
+            return self.offset
+
+    def verify(self):
+        """Vérifie taille et empreinte SHA-256 ; renvoie l’empreinte hexadécimale"""
+        if os.path.getsize(self.part_path) != self.offset:
+            self._resync()
+        if self.offset != self.size:
+            raise UploadError(f"Fichier incomplet ({self.offset}/{self.size} octets)")
+        digest = self._hasher.hexdigest()
+        if self.checksum and self.checksum.lower() != digest:
+            raise UploadError("Empreinte SHA-256 invalide, fichier rejeté")
+        return digest
+
+    def discard(self):
+        for path in (self.part_path, self.meta_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# 🗂️ Envois en cours de ce processus (les autres se rechargent depuis le disque)
+_uploads = {}
+_uploads_lock = threading.Lock()
+_last_purge = 0.0
+
+
+def _tmp_path(name):
+    return os.path.join(current_app.config["UPLOAD_TMP_FOLDER"], name)
+
+
+def start_upload(user_id, room_id, filename, size, checksum=None, upload_id=None):
+    """Ouvre (ou reprend si upload_id est fourni) un envoi par morceaux"""
+    if upload_id:
+        upload = get_upload(upload_id, user_id)
+        if upload is not None:
+            return upload
+
+    filename = secure_filename(filename or "")
+    if "." not in filename or filename.rsplit(".", 1)[-1].lower() not in current_app.config["ALLOWED_EXTENSIONS"]:
+        raise UploadError("Format de fichier non autorisé")
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("Taille de fichier invalide")
+    if size > current_app.config["UPLOAD_MAX_SIZE"]:
+        raise UploadError("Fichier trop volumineux")
+
+    os.makedirs(current_app.config["UPLOAD_TMP_FOLDER"], exist_ok=True)
+    purge_stale_uploads()
+    upload = ChunkedUpload(uuid.uuid4().hex, user_id, room_id, filename, size, checksum)
+    upload.save_meta()
+    open(upload.part_path, "wb").close()
+    with _uploads_lock:
+        _uploads[upload.upload_id] = upload
+    return upload
+
+
+def get_upload(upload_id, user_id):
+    """Envoi en cours appartenant à user_id (None s’il est inconnu ou expiré)"""
+    if not isinstance(upload_id, str) or not upload_id.isalnum():
+        return None
+    with _uploads_lock:
+        upload = _uploads.get(upload_id)
+        if upload is None:
+            upload = ChunkedUpload.load(upload_id)
+            if upload is not None:
+                _uploads[upload_id] = upload
+    if upload is None or upload.user_id != user_id:
+        return None
+    return upload
+
+
+def finish_upload(upload):
+    """Vérifie l’envoi et renvoie (chemin du fichier complet, empreinte) ; l’appelant le déplace"""
+    digest = upload.verify()
+    forget_upload(upload)
+    os.remove(upload.meta_path)
+    return upload.part_path, digest
+
+
+def abort_upload(upload):
+    forget_upload(upload)
+    upload.discard()
+
+
+def forget_upload(upload):
+    with _uploads_lock:
+        _uploads.pop(upload.upload_id, None)
+
+
+def purge_stale_uploads(force=False):
+    """Supprime les envois sans activité depuis UPLOAD_TMP_TTL secondes (au plus une fois par minute)"""
+    global _last_purge
+    now = time.time()
+    if not force and now - _last_purge < 60:
+        return
+    _last_purge = now
+
+    folder = current_app.config["UPLOAD_TMP_FOLDER"]
+    ttl = current_app.config["UPLOAD_TMP_TTL"]
+    last_activity = {}
+    for entry in os.scandir(folder):
+        upload_id, _, suffix = entry.name.partition(".")
+        if suffix in ("part", "json"):
+            last_activity[upload_id] = max(last_activity.get(upload_id, 0), entry.stat().st_mtime)
+
+    for upload_id, mtime in last_activity.items():
+        if now - mtime > ttl:
+            with _uploads_lock:
+                _uploads.pop(upload_id, None)
+            ChunkedUpload(upload_id, None, None, "", 0).discard()
+
@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app import db
+from app.models import User
+from app.passwords import password_hasher
+from app.stats import _dialect_insert
+
+users_cli = AppGroup("users", help="Gestion des comptes en masse.")
+
+ROLES = ("member", "moderator", "admin")
+
+# Taille des listes IN de la recherche de doublons (sous la limite de variables SQLite)
+LOOKUP_CHUNK = 5000
+
+
+# ======================================================
+# 📥 Import de comptes en masse (CSV / JSON)
+# ======================================================
+def read_rows(data, fmt):
+    """Lignes d’un fichier d’import : CSV avec en-tête, ou JSON (liste d’objets
+    ou {"users": [...]}) ; colonnes username, password, role et active (optionnelles).
+
+    Lève ValueError si le fichier est illisible.
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    if fmt == "json":
+        try:
+            rows = json.loads(data)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON invalide : {e}") from None
+        if isinstance(rows, dict):
+            rows = rows.get("users")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("JSON attendu : une liste d’objets")
+        return rows
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(data))
+        if not reader.fieldnames or "username" not in [f.strip().lower() for f in reader.fieldnames]:
+            raise ValueError("CSV attendu avec une ligne d’en-tête (username,password,role)")
+        return [{(k or "").strip().lower(): v for k, v in row.items()} for row in reader]
+    raise ValueError(f"Format inconnu : {fmt}")
+
+
+def import_users(rows, batch_size=None):
+    """Crée les comptes des lignes valides ; renvoie un rapport par ligne.
+
+    - doublons : une requête IN sur tous les noms du fichier (plus les doublons
+      internes au fichier), aucun mot de passe haché pour rien ;
+    - hachage dans le pool de processus des mots de passe (app.passwords), par
+      fenêtres laissant passer les connexions en cours ;
+    - insertion par lots de IMPORT_BATCH_SIZE, une transaction par lot ; un nom
+      créé entre-temps par ailleurs est ignoré (ON CONFLICT DO NOTHING).
+
+    Rapport : {"line" (rang de la ligne de données, en-tête CSV non compté),
+    "username", "status", "error"} ; statuts created, exists (déjà en base),
+    duplicate (répété dans le fichier), invalid, error (lot refusé par la base).
+    """
+    batch_size = batch_size or current_app.config["IMPORT_BATCH_SIZE"]
+
+    report, candidates, seen = [], [], set()
+    for line, row in enumerate(rows, 1):
+        entry = {"line": line, "username": str(row.get("username") or "").strip()}
+        report.append(entry)
+        values, error = _validate(row)
+        if error:
+            entry.update(status="invalid", error=error)
+        elif values["username"] in seen:
+            entry.update(status="duplicate", error="Répété dans le fichier")
+        else:
+            seen.add(values["username"])
+            candidates.append((entry, values))
+
+    existing = _existing_usernames([values["username"] for _, values in candidates])
+    pending = []
+    for entry, values in candidates:
+        if values["username"] in existing:
+            entry.update(status="exists", error="Nom d’utilisateur déjà pris")
+        else:
+            pending.append((entry, values))
+
+    hashes = password_hasher.hash_many([values.pop("password") for _, values in pending])
+    for (_, values), password_hash in zip(pending, hashes):
+        values["password_hash"] = password_hash
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            created = _insert_batch([values for _, values in batch])
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception("Échec d’un lot d’import de %d comptes", len(batch))
+            for entry, _ in batch:
+                entry.update(status="error", error=str(e.__class__.__name__))
+            continue
+        for entry, values in batch:
+            if values["username"] in created:
+                entry["status"] = "created"
+            else:
+                entry.update(status="exists", error="Nom d’utilisateur déjà pris")
+    return report
+
+
+def summarize(report):
+    """{statut: nombre de lignes}"""
+    summary = {}
+    for entry in report:
+        summary[entry["status"]] = summary.get(entry["status"], 0) + 1
+    return summary
+
+
+def _validate(row):
+    username = str(row.get("username") or "").strip()
+    password = row.get("password")
+    role = str(row.get("role") or "member").strip().lower()
+    active = row.get("active", True)
+    if isinstance(active, str):
+        active = active.strip().lower() not in ("0", "false", "non", "no", "")
+
+    if not username:
+        return None, "Nom d’utilisateur manquant"
+    if len(username) > User.username.type.length:
+        return None, "Nom d’utilisateur trop long"
+    if not isinstance(password, str) or not password:
+        return None, "Mot de passe manquant"
+    if role not in ROLES:
+        return None, f"Rôle inconnu : {role}"
+    return {"username": username, "password": password, "role": role, "active": bool(active)}, None
+
+
+def _existing_usernames(usernames):
+    existing = set()
+    for start in range(0, len(usernames), LOOKUP_CHUNK):
+        chunk = usernames[start:start + LOOKUP_CHUNK]
+        existing.update(db.session.execute(
+            db.select(User.username).where(User.username.in_(chunk))
+        ).scalars())
+    return existing
+
+
+def _insert_batch(rows):
+    """Insère un lot en une requête ; renvoie les noms réellement créés"""
+    table = User.__table__
+    insert = _dialect_insert(db.session.get_bind().dialect)
+    if insert is None:
+        db.session.execute(table.insert(), rows)
+        created = {row["username"] for row in rows}
+    else:
+        stmt = (
+            insert(table)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[table.c.username])
+            .returning(table.c.username)
+        )
+        created = set(db.session.execute(stmt).scalars())
+    db.session.commit()
+    return created
+
+
+def guess_format(filename):
+    return "json" if filename.lower().endswith(".json") else "csv"
+
+
+@users_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "json"]), help="Par défaut : selon l’extension.")
+@click.option("--report", "report_path", type=click.Path(dir_okay=False), help="Rapport complet (CSV).")
+def import_command(path, fmt, report_path):
+    """Importe des comptes depuis un fichier CSV ou JSON."""
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        rows = read_rows(data, fmt or guess_format(path))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    started = time.perf_counter()
+    report = import_users(rows)
+    elapsed = time.perf_counter() - started
+
+    for entry in report:
+        if entry["status"] != "created":
+            print(f"  ligne {entry['line']} ({entry['username'] or '?'}) : {entry['status']} — {entry.get('error', '')}")
+    if report_path:
+        with open(report_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["line", "username", "status", "error"])
+            writer.writeheader()
+            writer.writerows(report)
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(summarize(report).items()))
+    print(f"✔ {len(report)} lignes traitées en {elapsed:.1f}s ({summary or 'fichier vide'})")
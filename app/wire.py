@@ -0,0 +1,70 @@
+import calendar
+from datetime import datetime
+
+# Version du format compact annoncée par le client : io({auth: {wire: 1}})
+WIRE_VERSION = 1
+
+# Codes courts des champs de "receive_message" / "receive_file" (app/static/chat-wire.js)
+COMPACT_KEYS = {
+    "id": "i",
+    "seq": "s",
+    "user": "u",
+    "user_id": "w",
+    "room_id": "r",
+    "content": "c",
+    "timestamp": "t",
+    "file_path": "f",
+    "preview_path": "p",
+    "preview_pending": "g",
+    "ext": "e",
+}
+
+
+def epoch(timestamp):
+    """Horodatage UTC naïf → secondes depuis l’epoch (affiché par le client à son heure locale)"""
+    return calendar.timegm(timestamp.timetuple())
+
+
+# ======================================================
+# 🗜️ Format des événements de message (négocié à la connexion)
+# ======================================================
+# Un client à jour annonce auth.wire = WIRE_VERSION à la connexion Socket.IO :
+# il reçoit les messages en codes courts, sans champ vide, horodatés en
+# secondes. Les autres (onglet ouvert avant une mise à jour, scripts) gardent
+# les clés complètes et la date formatée. Les deux populations d’un salon sont
+# dans deux canaux distincts : une seule sérialisation par format et par message.
+class WireFormats:
+    def __init__(self):
+        self.enabled = False
+        self._compact = set()
+
+    def init_app(self, app):
+        self.enabled = app.config["SOCKETIO_COMPACT_EVENTS"]
+        self._compact.clear()
+
+    def negotiate(self, sid, auth):
+        if self.enabled and isinstance(auth, dict) and auth.get("wire") == WIRE_VERSION:
+            self._compact.add(sid)
+
+    def forget(self, sid):
+        self._compact.discard(sid)
+
+    def compact(self, sid):
+        return sid in self._compact
+
+    @staticmethod
+    def encode(payload, compact):
+        """Corps de l’événement au format choisi (les datetime sont convertis)"""
+        if not compact:
+            return {
+                key: value.strftime("%d/%m %H:%M") if isinstance(value, datetime) else value
+                for key, value in payload.items()
+            }
+        return {
+            COMPACT_KEYS.get(key, key): epoch(value) if isinstance(value, datetime) else value
+            for key, value in payload.items()
+            if value is not None and value is not False
+        }
+
+
+wire_formats = WireFormats()
@@ -0,0 +1,190 @@
+import atexit
+import logging
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from app import db, socketio
+from app.models import Message
+from app.recent import recent_messages
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MessageWriter:
+    """Persistance différée (write-behind) des messages du chat.
+
+    Les messages reçoivent un id attribué par le serveur et sont diffusés tout
+    de suite ; un thread d’écriture les insère ensuite par lots, dès que
+    WRITE_BEHIND_BATCH_SIZE messages sont en attente ou que
+    WRITE_BEHIND_FLUSH_INTERVAL secondes se sont écoulées.
+
+    La file est bornée : si elle reste pleine plus de WRITE_BEHIND_PUT_TIMEOUT
+    secondes, submit() refuse le message (contre-pression sur l’émetteur).
+
+    Les ids sont réservés en base par blocs de WRITE_BEHIND_ID_BLOCK
+    (message_id_seq sous PostgreSQL, sqlite_sequence sous SQLite) : les autres
+    écrivains (CLI, shell, redémarrage) ne peuvent pas les réutiliser.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._ids = deque()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config["MESSAGE_WRITE_BEHIND"]
+        if self.enabled and app.config["SOCKETIO_MESSAGE_QUEUE"]:
+            logger.warning("Écriture différée désactivée : incompatible avec plusieurs workers")
+            self.enabled = False
+        backend = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+        if self.enabled and backend not in ("sqlite", "postgresql"):
+            logger.warning("Écriture différée désactivée : pas de séquence d’ids pour %s", backend)
+            self.enabled = False
+        if not self.enabled:
+            return
+        self.batch_size = app.config["WRITE_BEHIND_BATCH_SIZE"]
+        self.flush_interval = app.config["WRITE_BEHIND_FLUSH_INTERVAL"]
+        self.put_timeout = app.config["WRITE_BEHIND_PUT_TIMEOUT"]
+        self.id_block = app.config["WRITE_BEHIND_ID_BLOCK"]
+        self._queue = queue.Queue(maxsize=app.config["WRITE_BEHIND_QUEUE_SIZE"])
+        atexit.register(self.shutdown)
+        self._drain_on_sigterm()
+
+    def _drain_on_sigterm(self):
+        """SIGTERM → sortie normale de l’interpréteur, donc vidage de la file par atexit"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    def reserve_id(self):
+        """Réserve le prochain id de message (None si le mode write-behind est inactif)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if not self._ids:
+                self._ids.extend(self._allocate_ids(self.id_block))
+            return self._ids.popleft()
+
+    def _allocate_ids(self, count):
+        """Prend `count` ids à la séquence de la table message, dans une transaction à part"""
+        with db.engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                rows = connection.execute(
+                    text("SELECT nextval(pg_get_serial_sequence('message', 'id')) FROM generate_series(1, :n)"),
+                    {"n": count},
+                )
+                return [value for (value,) in rows]
+
+            # SQLite : sqlite_sequence est la séquence de la table AUTOINCREMENT
+            connection.execute(text(
+                "INSERT INTO sqlite_sequence (name, seq) "
+                "SELECT 'message', (SELECT COALESCE(MAX(id), 0) FROM message) "
+                "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'message')"
+            ))
+            last = connection.execute(
+                text("UPDATE sqlite_sequence SET seq = seq + :n WHERE name = 'message' RETURNING seq"),
+                {"n": count},
+            ).scalar_one()
+            return range(last - count + 1, last + 1)
+
+    def submit(self, row, sid=None):
+        """Met un message en file d’écriture. Renvoie False si la file est saturée.
+
+        - row : colonnes du Message (id compris, cf. reserve_id)
+        - sid : session Socket.IO à prévenir via "message_saved" après l’écriture
+        """
+        self._ensure_started()
+        try:
+            self._queue.put((row, sid), timeout=self.put_timeout)
+        except queue.Full:
+            logger.warning("File d’écriture saturée, message %s refusé", row.get("id"))
+            return False
+        return True
+
+    def shutdown(self):
+        """Vide la file et arrête le thread d’écriture"""
+        if self._thread is None:
+            return
+        self._queue.put((_STOP, None))
+        self._thread.join()
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item[0] is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        """Écrit un lot ; en cas d’échec, le lot est retenté puis écrit message par message.
+
+        Seuls les messages réellement refusés par la base sont signalés en échec.
+        """
+        failed = set()
+        with self.app.app_context():
+            try:
+                if not self._insert([row for row, _ in batch], attempts=2):
+                    logger.warning("Échec d’un lot de %d messages, écriture message par message", len(batch))
+                    for row, _ in batch:
+                        if not self._insert([row]):
+                            failed.add(row["id"])
+            finally:
+                db.session.remove()
+
+        for row, sid in batch:
+            if row["id"] in failed:
+                # Déjà servi depuis la mémoire : le salon sera relu en base
+                recent_messages.discard(row["room_id"])
+            if sid is not None:
+                payload = {"id": row["id"], "ok": row["id"] not in failed}
+                if not payload["ok"]:
+                    payload["error"] = "Message non enregistré"
+                socketio.emit("message_saved", payload, to=sid)
+
+    def _insert(self, rows, attempts=1):
+        for attempt in range(attempts):
+            try:
+                db.session.add_all([Message(**row) for row in rows])
+                db.session.commit()
+                return True
+            except Exception:
+                db.session.rollback()
+                logger.exception("Échec de l’écriture de %d message(s) (tentative %d)", len(rows), attempt + 1)
+        return False
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,155 @@
+"""Écrivains et lecteurs concurrents sur la base (profil SQLite, pool).
+
+Chaque profil tourne dans un processus à part (la configuration est lue au
+démarrage) : --writers threads insèrent des messages comme "send_message"
+(rang réservé, INSERT, commit court) pendant que --readers threads relisent
+l’historique d’un salon. Compte les opérations par seconde, les erreurs
+« database is locked » et l’attente moyenne d’une connexion du pool.
+
+    python benchmarks/bench_db_writers.py --writers 8 --readers 8 --seconds 10
+    python benchmarks/bench_db_writers.py --url postgresql://chat@localhost/bench
+
+Profils SQLite comparés : ancien (journal DELETE, synchronous FULL, pas de
+mmap, attente de verrou du pilote) et WAL (réglages par défaut de config.py).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROFILES = {
+    "delete/full": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE_KB": "0",
+        "SQLITE_BUSY_TIMEOUT_MS": "5000",
+    },
+    "wal/normal": {},
+}
+
+
+def run_child(args):
+    """Mesure d’un profil (processus enfant) : résultat JSON sur la sortie standard"""
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+    from app import create_app, db
+    from app.metrics import metrics
+    from app.models import Message, Room, User
+    from app.sequences import room_sequences
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", role="member", active=True, password_hash="-")
+        room = Room(name="bench")
+        db.session.add_all([user, room])
+        db.session.commit()
+        user_id, room_id = user.id, room.id
+
+    counts = {"writes": 0, "reads": 0, "locked": 0, "pool_timeouts": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def guarded(operation):
+        try:
+            operation()
+        except OperationalError as exc:
+            db.session.rollback()
+            if "locked" not in str(exc):
+                raise
+            return "locked"
+        except PoolTimeout:
+            db.session.rollback()
+            return "pool_timeouts"
+
+    def write():
+        db.session.add(Message(
+            content="x" * 80, user_id=user_id, room_id=room_id, seq=room_sequences.reserve(room_id),
+        ))
+        db.session.commit()
+
+    def read():
+        db.session.execute(
+            select(Message.id, Message.content, Message.timestamp)
+            .where(Message.room_id == room_id)
+            .order_by(Message.timestamp.desc(), Message.id.desc())
+            .limit(50)
+        ).all()
+        db.session.rollback()  # fin de la transaction de lecture
+
+    def worker(operation, key):
+        with app.app_context():
+            while not stop.is_set():
+                count(guarded(operation) or key)
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(write, "writes")) for _ in range(args.writers)]
+    threads += [threading.Thread(target=worker, args=(read, "reads")) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    waits = [h for h in metrics.snapshot()["histograms"] if h["name"] == "db_pool_checkout_wait_seconds"]
+    checkouts = sum(h["count"] for h in waits)
+    counts["pool_wait_ms"] = sum(h["sum"] for h in waits) / checkouts * 1000 if checkouts else 0
+    print(json.dumps(counts))
+
+
+def run_profile(args, url, overrides):
+    env = dict(os.environ, DATABASE_URL=url, KDF_WORKERS="0", INSTRUMENTATION="0", **overrides)
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child",
+        "--writers", str(args.writers), "--readers", str(args.readers), "--seconds", str(args.seconds),
+    ]
+    output = subprocess.run(command, env=env, cwd=ROOT, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--url", help="base serveur à mesurer (vide : profils SQLite dans un dossier temporaire)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    print(f"{args.writers} écrivains, {args.readers} lecteurs, {args.seconds:g} s par profil")
+    results = []
+    if args.url:
+        results.append((args.url.split(":", 1)[0], run_profile(args, args.url, {})))
+    else:
+        for name, overrides in PROFILES.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                results.append((name, run_profile(args, f"sqlite:///{tmp}/bench.db", overrides)))
+
+    print(f"{'profil':<14}{'écritures/s':>13}{'lectures/s':>12}{'verrouillée':>13}{'pool saturé':>13}{'attente pool':>14}")
+    for name, counts in results:
+        print(
+            f"{name:<14}{counts['writes'] / args.seconds:>13.0f}{counts['reads'] / args.seconds:>12.0f}"
+            f"{counts['locked']:>13}{counts['pool_timeouts']:>13}{counts['pool_wait_ms']:>12.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Latence du chat pendant une rafale de connexions (hachage des mots de passe).
+
+Lance `python run.py`, mesure le temps d’aller-retour d’un "send_message"
+(accusé de réception) au repos, puis pendant que --logins connexions HTTP
+simultanées font calculer leur empreinte scrypt au serveur. Compare le
+hachage dans les threads des requêtes (KDF_WORKERS=0) et le pool de
+processus borné (KDF_WORKERS=1...).
+
+    python benchmarks/bench_login_storm.py --kdf-workers 0 1 --logins 200
+
+Les limites par adresse IP sont levées (tous les clients sont en 127.0.0.1) :
+seul le pool et sa file (KDF_QUEUE_LIMIT) protègent le serveur.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sioclient import SioClient, login, wait_for_port  # noqa: E402
+
+
+def prepare_database(path):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["KDF_WORKERS"] = "0"
+    from app import create_app, db
+    from app.models import Room, User
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", role="member", active=True)
+        user.set_password("bench")
+        room = Room(name="bench")
+        db.session.add_all([user, room])
+        db.session.commit()
+        return room.id
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def chat_latencies(client, room_id, stop, interval=0.02):
+    """Allers-retours send_message (ms) jusqu’à ce que `stop` soit levé"""
+    samples = []
+    n = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        ack = client.call("send_message", {"room_id": room_id, "content": f"ping {n}"})
+        if ack is None or not ack.get("ok"):
+            samples.append(float("inf"))
+        else:
+            samples.append((time.perf_counter() - started) * 1000)
+        n += 1
+        time.sleep(interval)
+    return samples
+
+
+def login_status(base_url):
+    data = urllib.parse.urlencode({"username": "bench", "password": "bench"}).encode()
+    opener = urllib.request.build_opener(NoRedirect)
+    try:
+        return opener.open(base_url + "/login", data=data, timeout=60).status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return "erreur"
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def run(kdf_workers, args, db_path, room_id):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        PORT=str(args.port),
+        KDF_WORKERS=str(kdf_workers),
+        LOGIN_IP_BURST="0",
+        STATS_RECONCILE_INTERVAL="0",
+        RETENTION_INTERVAL="0",
+    )
+    server = subprocess.Popen([sys.executable, "run.py"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{args.port}"
+        wait_for_port("127.0.0.1", args.port)
+        client = SioClient(base_url, login(base_url, "bench", "bench"))
+        client.call("join_room", {"room_id": room_id})
+
+        def measure(duration):
+            stop = threading.Event()
+            result = []
+            thread = threading.Thread(target=lambda: result.extend(chat_latencies(client, room_id, stop)))
+            thread.start()
+            duration()
+            stop.set()
+            thread.join()
+            return result
+
+        idle = measure(lambda: time.sleep(2))
+
+        statuses = []
+        def storm():
+            threads = [threading.Thread(target=lambda: statuses.append(login_status(base_url))) for _ in range(args.logins)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        started = time.perf_counter()
+        busy = measure(storm)
+        storm_seconds = time.perf_counter() - started
+        client.close()
+        return idle, busy, statuses, storm_seconds
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kdf-workers", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--port", type=int, default=5700)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        room_id = prepare_database(db_path)
+        print(f"Cœurs disponibles : {os.cpu_count()} ; {args.logins} connexions simultanées")
+        print(f"{'KDF_WORKERS':>11} {'repos p50':>10} {'rafale p50':>11} {'p95':>8} {'max':>8} "
+              f"{'rafale (s)':>10}  connexions (statut HTTP)")
+        for kdf_workers in args.kdf_workers:
+            idle, busy, statuses, seconds = run(kdf_workers, args, db_path, room_id)
+            counts = ", ".join(f"{status}: {statuses.count(status)}" for status in sorted(set(statuses), key=str))
+            print(f"{kdf_workers:>11} {statistics.median(idle):>8.1f}ms {statistics.median(busy):>9.1f}ms "
+                  f"{percentile(busy, 0.95):>6.0f}ms {max(busy):>6.0f}ms {seconds:>10.1f}  {counts}")
+    print("302 = connecté, 503 = file du hachage pleine (KDF_QUEUE_LIMIT), réessayer plus tard")
+
+
+if __name__ == "__main__":
+    main()
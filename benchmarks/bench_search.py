@@ -0,0 +1,132 @@
+"""Temps de réponse de la recherche plein texte (app.search) sur un gros historique.
+
+Crée une base SQLite temporaire de --messages messages (vocabulaire à
+distribution de Zipf, --rooms salons, --users auteurs, deux ans d’historique),
+reconstruit l’index FTS5 puis chronomètre search_messages() pour des requêtes
+de sélectivités différentes, avec et sans portée salon / auteur / période.
+
+    python benchmarks/bench_search.py --messages 1000000
+    python benchmarks/bench_search.py --db /tmp/search.db   # réutilise une base déjà générée
+
+Objectif : moins de 50 ms par requête (p95) pour une page de résultats.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VOCABULARY_SIZE = 20000
+
+
+def word(rank):
+    return f"mot{rank}"
+
+
+def populate(path, args):
+    """Remplit la base sans trigger d’indexation (insertion en masse), puis reconstruit l’index"""
+    rng = random.Random(42)
+    weights = [1 / (rank + 1) for rank in range(VOCABULARY_SIZE)]
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        "DROP TRIGGER message_fts_insert; PRAGMA journal_mode=WAL; PRAGMA synchronous=OFF;"
+    )
+    connection.executemany(
+        "INSERT INTO user (id, username, password_hash, role, active) VALUES (?, ?, 'x', 'member', 1)",
+        [(i, f"user{i}") for i in range(1, args.users + 1)],
+    )
+    connection.executemany(
+        "INSERT INTO room (id, name) VALUES (?, ?)", [(i, f"room{i}") for i in range(1, args.rooms + 1)]
+    )
+
+    start = datetime(2024, 1, 1)
+    step = timedelta(days=730) / args.messages
+    batch = 50000
+    for first in range(0, args.messages, batch):
+        rows = []
+        for i in range(first, min(first + batch, args.messages)):
+            words = rng.choices(range(VOCABULARY_SIZE), weights, k=rng.randint(4, 16))
+            rows.append((
+                " ".join(word(w) for w in words),
+                (start + step * i).isoformat(sep=" "),
+                rng.randint(1, args.users),
+                rng.randint(1, args.rooms),
+            ))
+        connection.executemany("INSERT INTO message (content, timestamp, user_id, room_id) VALUES (?, ?, ?, ?)", rows)
+        connection.commit()
+        print(f"\r  {min(first + batch, args.messages)} messages", end="", flush=True)
+    print()
+
+    started = time.perf_counter()
+    connection.execute("INSERT INTO message_fts (message_fts) VALUES ('rebuild')")
+    connection.execute("INSERT INTO message_fts (message_fts) VALUES ('optimize')")
+    connection.commit()
+    connection.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20, help="exécutions par requête")
+    parser.add_argument("--db", help="base à créer ou à réutiliser (défaut : fichier temporaire)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "search.db")
+    exists = os.path.exists(path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(path)}"
+    from app import create_app, db
+    from app.search import search_messages
+
+    app = create_app()
+    if not exists:
+        with app.app_context():
+            db.create_all()
+        print(f"Génération de {args.messages} messages…")
+        rebuild = populate(path, args)
+        print(f"Index reconstruit en {rebuild:.1f}s ({os.path.getsize(path) / 1e6:.0f} Mo au total)\n")
+
+    middle = datetime(2025, 1, 1)
+    cases = [
+        ("mot fréquent", dict(terms=word(0))),
+        ("mot moyen", dict(terms=word(300))),
+        ("mot rare", dict(terms=word(3000))),
+        ("deux mots", dict(terms=f"{word(10)} {word(200)}")),
+        ("préfixe", dict(terms="mot123*")),
+        ("fréquent + salon", dict(terms=word(0), room_id=7)),
+        ("rare + salon", dict(terms=word(3000), room_id=7)),
+        ("moyen + auteur", dict(terms=word(300), user_id=42)),
+        ("fréquent + période", dict(terms=word(0), since=middle, until=middle + timedelta(days=30))),
+        ("rare + salon + période", dict(terms=word(3000), room_id=7, since=middle, until=middle + timedelta(days=90))),
+    ]
+
+    print(f"{'requête':<24} {'résultats':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    worst = 0
+    with app.app_context():
+        for label, kwargs in cases:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                results = search_messages(limit=50, **kwargs)
+                timings.append((time.perf_counter() - started) * 1000)
+                db.session.expunge_all()
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            worst = max(worst, p95)
+            print(f"{label:<24} {len(results):>9} {statistics.median(timings):>8.1f} {p95:>8.1f} {timings[-1]:>8.1f}")
+
+    verdict = "sous" if worst < 50 else "au-delà de"
+    print(f"\np95 le plus lent : {worst:.1f} ms ({verdict} l’objectif de 50 ms)")
+
+
+if __name__ == "__main__":
+    main()
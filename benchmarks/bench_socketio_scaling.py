@@ -0,0 +1,126 @@
+"""Débit Socket.IO (messages délivrés / s) en fonction du nombre de workers.
+
+Pour chaque valeur de --workers, lance `python run.py` en mode multi-workers
+(broker local intégré), connecte --clients clients dans un même salon, fait
+envoyer --messages messages par --senders émetteurs et mesure le nombre de
+livraisons par seconde.
+
+    python benchmarks/bench_socketio_scaling.py --workers 1 2 4 --clients 40
+
+Le gain n’apparaît qu’avec des cœurs libres : clients, broker et workers
+tournent sur la même machine. Avec un seul cœur, chaque worker ajouté coûte
+un saut supplémentaire par le broker et le débit baisse.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sioclient import SioClient, login, wait_for_port  # noqa: E402
+
+
+def prepare_database(path):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from app import create_app, db
+    from app.models import Room, User
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", role="member", active=True)
+        user.set_password("bench")
+        room = Room(name="bench")
+        db.session.add_all([user, room])
+        db.session.commit()
+        return room.id
+
+
+def run(workers, args, db_path, room_id):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        PORT=str(args.port),
+        WORKERS=str(workers),
+        SOCKETIO_MESSAGE_QUEUE=f"local://127.0.0.1:{args.port + 1}",
+        STATS_RECONCILE_INTERVAL="0",
+    )
+    server = subprocess.Popen([sys.executable, "run.py"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{args.port}"
+        wait_for_port("127.0.0.1", args.port)
+        cookie = login(base_url, "bench", "bench")
+
+        clients = [SioClient(base_url, cookie) for _ in range(args.clients)]
+        for client in clients:
+            client.emit("join_room", {"room_id": room_id})
+        time.sleep(0.5)
+
+        expected = args.senders * args.messages
+        received = [0] * len(clients)
+
+        def receiver(i, client):
+            while received[i] < expected:
+                event = client.receive(timeout=args.timeout)
+                if event is None:
+                    return
+                if event[0] == "receive_message":
+                    received[i] += 1
+
+        def sender(client):
+            for n in range(args.messages):
+                client.emit("send_message", {"room_id": room_id, "content": f"bench {n}"})
+
+        threads = [threading.Thread(target=receiver, args=(i, c)) for i, c in enumerate(clients)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        senders = [threading.Thread(target=sender, args=(c,)) for c in clients[:args.senders]]
+        for t in senders:
+            t.start()
+        for t in threads + senders:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        for client in clients:
+            client.close()
+        delivered = sum(received)
+        return delivered, elapsed, delivered / (expected * len(clients))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=40)
+    parser.add_argument("--senders", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=100, help="messages par émetteur")
+    parser.add_argument("--port", type=int, default=5600)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        room_id = prepare_database(db_path)
+
+        cores = os.cpu_count()
+        print(f"Cœurs disponibles : {cores}")
+        if max(args.workers) >= (cores or 1):
+            print("⚠️ Plus de workers que de cœurs libres : le débit ne peut pas augmenter")
+        print(f"{'workers':>8} {'livrés':>10} {'durée (s)':>10} {'msg/s':>10} {'complétude':>11}")
+        for workers in args.workers:
+            delivered, elapsed, ratio = run(workers, args, db_path, room_id)
+            print(f"{workers:>8} {delivered:>10} {elapsed:>10.2f} {delivered / elapsed:>10.0f} {ratio:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
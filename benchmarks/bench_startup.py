@@ -0,0 +1,109 @@
+"""Temps de démarrage d’un worker : import du paquet, create_app(), première requête.
+
+Chaque mesure tourne dans un processus Python neuf (caches d’import froids
+côté interpréteur, fichiers .pyc déjà compilés) sur une base préparée par
+init_db(). Le démarrage ne doit ni toucher au schéma ni importer Alembic.
+
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 1500
+    python benchmarks/bench_startup.py --top 15    # modules les plus lents à importer
+
+Code de sortie 1 si la médiane import + create_app() dépasse --budget-ms
+(à placer dans la CI pour garder le démarrage sous contrôle).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get("/login").status_code
+answered = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_ms": (created - imported) * 1000,
+    "first_request_ms": (answered - created) * 1000,
+    "status": status,
+    "alembic": "alembic" in sys.modules,
+}))
+"""
+
+
+def prepare_database(path):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["KDF_WORKERS"] = "0"
+    from app import create_app
+    from app.schema import init_db
+
+    init_db(create_app())
+
+
+def measure(env, importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD]
+    result = subprocess.run(command, env=env, cwd=ROOT, check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_imports(stderr, top):
+    """Modules de premier niveau (import direct) triés par temps cumulé"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500, help="médiane import + create_app() tolérée")
+    parser.add_argument("--top", type=int, default=0, help="afficher les N imports les plus lents")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare_database(os.path.join(tmp, "startup.db"))
+        env = dict(os.environ, INSTRUMENTATION=os.environ.get("INSTRUMENTATION", "1"))
+        runs = [measure(env)[0] for _ in range(args.runs)]
+        if args.top:
+            _, stderr = measure(env, importtime=True)
+
+    print(f"{'étape':<22}{'médiane':>10}{'max':>10}")
+    for key, label in (("import_ms", "import app"), ("create_ms", "create_app()"), ("first_request_ms", "1re requête")):
+        values = [run[key] for run in runs]
+        print(f"{label:<22}{statistics.median(values):>8.0f}ms{max(values):>8.0f}ms")
+    boot = statistics.median(run["import_ms"] + run["create_ms"] for run in runs)
+    print(f"{'démarrage':<22}{boot:>8.0f}ms   (budget {args.budget_ms:.0f} ms)")
+
+    if args.top:
+        print(f"\nImports les plus lents (cumulés, {args.top} premiers) :")
+        for ms, name in slowest_imports(stderr, args.top):
+            print(f"  {ms:>8.1f} ms  {name}")
+
+    failures = []
+    if any(run["alembic"] for run in runs):
+        failures.append("Alembic importé au démarrage")
+    if any(run["status"] != 200 for run in runs):
+        failures.append(f"1re requête en erreur ({runs[0]['status']})")
+    if boot > args.budget_ms:
+        failures.append(f"démarrage {boot:.0f} ms > budget {args.budget_ms:.0f} ms")
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
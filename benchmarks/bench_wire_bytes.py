@@ -0,0 +1,142 @@
+"""Octets par message Socket.IO et par chargement de page, avant / après compression.
+
+Messages : --messages événements "receive_message" réalistes (5 auteurs,
+textes de longueurs variées) encodés comme sur le fil (paquet Engine.IO +
+Socket.IO, en-tête de trame WebSocket), en clés complètes et en format
+compact (app.wire), sans et avec permessage-deflate (contexte conservé d’un
+message à l’autre, comme le négocient simple-websocket et eventlet).
+
+Page : GET /chat/<salon> (--history messages affichés) et fichiers statiques
+du site, sans compression, en gzip et en brotli (si le module est installé),
+variantes précompressées comme le fait flask assets compress.
+
+    python benchmarks/bench_wire_bytes.py --messages 500 --history 50
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import zlib
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = (
+    "bonjour salut merci réunion demain soir association local clés atelier "
+    "vendredi bénévoles inscription repas salle mairie projet budget photo "
+    "rendez-vous d’accord parfait je peux passer vers heures apporter"
+).split()
+AUTHORS = [(2, "alice"), (3, "bruno"), (4, "chloé"), (5, "djamel"), (6, "emma")]
+
+
+def chat_messages(count, room_id=1):
+    rng = random.Random(7)
+    started = datetime(2026, 10, 18, 9, 0)
+    for n in range(count):
+        user_id, username = rng.choice(AUTHORS)
+        content = " ".join(rng.choice(WORDS) for _ in range(rng.choice([2, 4, 6, 10, 20])))
+        yield {
+            "id": 10_000 + n,
+            "seq": 1 + n,
+            "user": username,
+            "content": content.capitalize(),
+            "timestamp": started + timedelta(seconds=37 * n),
+            "room_id": room_id,
+            "user_id": user_id,
+        }
+
+
+def frame_size(payload_size):
+    """Trame WebSocket serveur → client (non masquée)"""
+    return payload_size + (2 if payload_size < 126 else 4 if payload_size < 65536 else 10)
+
+
+def socket_bytes(count):
+    from socketio import packet
+    from app.wire import WireFormats
+
+    results = {}
+    for compact in (False, True):
+        plain = deflated = 0
+        deflate = zlib.compressobj(wbits=-15)  # permessage-deflate, contexte conservé
+        for message in chat_messages(count):
+            body = WireFormats.encode(message, compact)
+            data = ("4" + packet.Packet(packet.EVENT, data=["receive_message", body]).encode()).encode()
+            plain += frame_size(len(data))
+            compressed = deflate.compress(data) + deflate.flush(zlib.Z_SYNC_FLUSH)
+            deflated += frame_size(len(compressed) - 4)  # 00 00 ff ff retirés (RFC 7692)
+        results["compact" if compact else "json"] = (plain / count, deflated / count)
+    return results
+
+
+def page_bytes(history):
+    from app import create_app, db
+    from app.compression import compression
+    from app.models import Message, Room, User
+
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        reader = User(id=1, username="bench", role="member", active=True)
+        reader.set_password("bench")
+        db.session.add_all([reader, Room(id=1, name="bench")])
+        db.session.add_all(
+            User(id=user_id, username=username, role="member", active=True, password_hash="-")
+            for user_id, username in AUTHORS
+        )
+        for message in chat_messages(history):
+            db.session.add(Message(
+                content=message["content"], user_id=message["user_id"], room_id=1, timestamp=message["timestamp"],
+            ))
+        db.session.commit()
+
+    client = app.test_client()
+    client.post("/login", data={"username": "bench", "password": "bench"})
+    page = {}
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli else [])
+    for encoding in encodings:
+        response = client.get("/chat/1", headers={"Accept-Encoding": encoding})
+        page[encoding] = len(response.data)
+
+    # Fichiers statiques : tailles des variantes produites par flask assets compress
+    assets = {"identity": 0, "gzip": 0, "br": 0}
+    with tempfile.TemporaryDirectory() as tmp:
+        static = os.path.join(tmp, "static")
+        shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns("uploads", "*.gz", "*.br"))
+        for _, size, gz, br in compression.precompress(static):
+            assets["identity"] += size
+            assets["gzip"] += gz or size
+            assets["br"] += br or gz or size
+    return page, {name: assets[name] for name in encodings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--history", type=int, default=50, help="messages affichés sur la page du salon")
+    args = parser.parse_args()
+
+    # Base temporaire, fixée avant le premier import de l’application (config.py)
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/wire.db"
+    os.environ["KDF_WORKERS"] = "0"
+
+    print(f"receive_message ({args.messages} messages), octets par message sur le fil")
+    print(f"{'format':<10}{'brut':>10}{'deflate':>10}")
+    for name, (plain, deflated) in socket_bytes(args.messages).items():
+        print(f"{name:<10}{plain:>10.1f}{deflated:>10.1f}")
+
+    page, assets = page_bytes(args.history)
+    print(f"\nChargement de /chat/<salon> ({args.history} messages), octets")
+    print(f"{'encodage':<10}{'HTML':>10}{'statiques':>11}{'total':>10}")
+    for encoding in page:
+        print(f"{encoding:<10}{page[encoding]:>10}{assets[encoding]:>11}{page[encoding] + assets[encoding]:>10}")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Test de charge Socket.IO : des milliers de clients simulés sur un serveur en marche.
+
+    python serve.py &
+    python benchmarks/loadtest_socketio.py --url http://127.0.0.1:5000 \\
+        --username admin --password admin --room 1 --clients 2000 --server-pid $!
+
+Rapporte le nombre de connexions établies, la mémoire par connexion côté
+serveur (si --server-pid est fourni, workers compris) et les latences
+p50 / p99 entre l’émission d’un message et sa réception.
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sioclient import SioClient, login  # noqa: E402
+
+PREFIX = "loadtest:"
+
+
+def rss_bytes(pid):
+    """Mémoire résidente d’un processus et de ses descendants directs (Linux)"""
+    pids = [pid]
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    total = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--room", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--ramp", type=int, default=200, help="connexions ouvertes par seconde")
+    parser.add_argument("--senders", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=2.0, help="messages / s par émetteur")
+    parser.add_argument("--duration", type=float, default=20.0, help="durée de la phase d’envoi (s)")
+    parser.add_argument("--connect-timeout", type=float, default=30.0)
+    parser.add_argument("--server-pid", type=int)
+    args = parser.parse_args()
+
+    cookie = login(args.url, args.username, args.password)
+    rss_before = rss_bytes(args.server_pid) if args.server_pid else None
+
+    clients, failures, latencies = [], [0], []
+    pool = eventlet.GreenPool(args.clients + args.senders + 10)
+
+    def receiver(client):
+        while True:
+            try:
+                event = client.receive()
+            except Exception:
+                return
+            if event is None:
+                return
+            name, data = event
+            if name == "receive_message" and str(data.get("content", "")).startswith(PREFIX):
+                latencies.append(time.time() - float(data["content"][len(PREFIX):]))
+
+    def connect():
+        try:
+            client = SioClient(args.url, cookie, timeout=args.connect_timeout)
+            client.emit("join_room", {"room_id": args.room})
+        except Exception:
+            failures[0] += 1
+            return
+        clients.append(client)
+        pool.spawn(receiver, client)
+
+    # 1) Montée en charge progressive
+    started = time.perf_counter()
+    for i in range(args.clients):
+        pool.spawn(connect)
+        if (i + 1) % args.ramp == 0:
+            eventlet.sleep(1)
+    while len(clients) + failures[0] < args.clients and time.perf_counter() - started < 120:
+        eventlet.sleep(0.2)
+    connect_time = time.perf_counter() - started
+    eventlet.sleep(1)
+    rss_after = rss_bytes(args.server_pid) if args.server_pid else None
+
+    # 2) Envoi de messages horodatés
+    def sender(client):
+        deadline = time.monotonic() + args.duration
+        while time.monotonic() < deadline:
+            client.emit("send_message", {"room_id": args.room, "content": f"{PREFIX}{time.time()}"})
+            eventlet.sleep(1 / args.rate)
+
+    senders = [pool.spawn(sender, c) for c in clients[:args.senders]]
+    for s in senders:
+        s.wait()
+    eventlet.sleep(2)
+
+    print(f"Connexions établies   : {len(clients)} / {args.clients} ({failures[0]} échecs) en {connect_time:.1f}s")
+    if rss_before is not None and clients:
+        per_conn = (rss_after - rss_before) / len(clients)
+        print(f"Mémoire serveur       : {rss_before / 2**20:.1f} Mo → {rss_after / 2**20:.1f} Mo "
+              f"({per_conn / 1024:.1f} Ko / connexion)")
+    print(f"Messages reçus        : {len(latencies)}")
+    print(f"Latence p50 / p99     : {percentile(latencies, 50) * 1000:.1f} ms / {percentile(latencies, 99) * 1000:.1f} ms")
+
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    main()
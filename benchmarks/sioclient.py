@@ -0,0 +1,90 @@
+"""Client Socket.IO minimal (Engine.IO v4, transport websocket) pour les benchmarks.
+
+Volontairement réduit : connexion au namespace "/", émission d’événements,
+réception des événements serveur et réponse aux pings.
+"""
+import http.cookiejar
+import json
+import socket
+import time
+import urllib.parse
+import urllib.request
+import simple_websocket
+
+
+def login(base_url, username, password):
+    """Ouvre une session HTTP et renvoie l’en-tête Cookie correspondant"""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    data = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    opener.open(base_url + "/login", data=data)
+    cookie = "; ".join(f"{c.name}={c.value}" for c in jar)
+    if "session=" not in cookie:
+        raise RuntimeError(f"Connexion impossible pour {username}")
+    return cookie
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"{host}:{port} injoignable")
+
+
+class SioClient:
+    def __init__(self, base_url, cookie=None, timeout=10):
+        url = base_url.replace("http", "ws", 1) + "/socket.io/?EIO=4&transport=websocket"
+        self.ws = simple_websocket.Client(url, headers={"Cookie": cookie} if cookie else None)
+        self._expect("0", timeout)      # OPEN
+        self.ws.send("40")              # CONNECT "/"
+        self._expect("40", timeout)
+
+    def _expect(self, prefix, timeout=10):
+        """Attend un paquet de contrôle ; les événements reçus entre-temps sont ignorés"""
+        while True:
+            pkt = self.ws.receive(timeout=timeout)
+            if pkt is None:
+                raise RuntimeError(f"Paquet {prefix!r} attendu, rien reçu")
+            if pkt.startswith(prefix) and not pkt.startswith("42"):
+                return pkt
+
+    def emit(self, event, data):
+        self.ws.send("42" + json.dumps([event, data]))
+
+    def call(self, event, data, timeout=10):
+        """Émet avec accusé de réception et renvoie la réponse du serveur (None si délai dépassé).
+        Les événements reçus pendant l’attente sont ignorés."""
+        self._ack_id = getattr(self, "_ack_id", 0) + 1
+        prefix = f"43{self._ack_id}["
+        self.ws.send(f"42{self._ack_id}" + json.dumps([event, data]))
+        deadline = time.monotonic() + timeout
+        while True:
+            pkt = self.ws.receive(timeout=max(0, deadline - time.monotonic()))
+            if pkt is None:
+                return None
+            if pkt == "2":
+                self.ws.send("3")
+            elif pkt.startswith(prefix):
+                args = json.loads(pkt[len(prefix) - 1:])
+                return args[0] if args else None
+
+    def receive(self, timeout=None):
+        """Renvoie (événement, données) ou None si rien n’arrive avant timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            pkt = self.ws.receive(timeout=remaining)
+            if pkt is None:
+                return None
+            if pkt == "2":                                # PING → PONG
+                self.ws.send("3")
+            elif pkt.startswith("42"):
+                event, *args = json.loads(pkt[2:])
+                return event, args[0] if args else None
+
+    def close(self):
+        self.ws.close()
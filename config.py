@@ -8,8 +8,132 @@ class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret_change_me")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'app.db')}")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # 🗄️ Profil de la base (app.database). SQLite : PRAGMA appliqués à chaque
+    # connexion (vide = défaut du pilote) ; cache de pages en Kio par connexion
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 16 * 1024))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 10000))
+    # Pool de connexions (par worker) ; pre-ping et recyclage pour les bases serveur
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10 Mo
 
+    # 💬 Nombre de messages chargés par page d’historique
+    CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", 50))
+    # 🔁 Rattrapage après reconnexion : au-delà, le client recharge la page
+    CATCH_UP_LIMIT = int(os.getenv("CATCH_UP_LIMIT", 500))
+
+    # 🔔 Cache des compteurs de non-lus (nombre d’utilisateurs, durée de vie en s)
+    # Désactivé par défaut avec plusieurs workers : chaque processus n’y verrait
+    # que ses propres messages (badges faux jusqu’à expiration)
+    UNREAD_CACHE_SIZE = int(os.getenv("UNREAD_CACHE_SIZE", 0 if os.getenv("SOCKETIO_MESSAGE_QUEUE") else 1024))
+    UNREAD_CACHE_TTL = int(os.getenv("UNREAD_CACHE_TTL", 300))
+
+    # 🔥 Derniers messages des salons actifs en mémoire (app.recent) : messages par
+    # salon et plafond mémoire total ; désactivé par défaut avec plusieurs workers
+    RECENT_MESSAGES_PER_ROOM = int(os.getenv("RECENT_MESSAGES_PER_ROOM", 0 if os.getenv("SOCKETIO_MESSAGE_QUEUE") else CHAT_PAGE_SIZE))
+    RECENT_MESSAGES_MAX_BYTES = int(os.getenv("RECENT_MESSAGES_MAX_BYTES", 8 * 1024 * 1024))
+
+    # 🪪 Cache des comptes et salons (app.identity) : entrées, durée de vie (s).
+    # Invalidé par les routes d’administration du worker qui les traite : en
+    # multi-workers, les autres voient la modification au plus tard après le TTL
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 10000))
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", 5 if os.getenv("SOCKETIO_MESSAGE_QUEUE") else 300))
+
+    # 📊 Statistiques : durée du cache des tableaux de bord et période de réconciliation (s)
+    # (cache propre à chaque worker : au plus STATS_CACHE_TTL secondes de retard)
+    STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", 30))
+    STATS_RECONCILE_INTERVAL = int(os.getenv("STATS_RECONCILE_INTERVAL", 3600))
+
+    # ⏱️ Instrumentation des routes et événements Socket.IO (app.instrumentation),
+    # exposée en format Prometheus sur /metrics ; journal des requêtes SQL plus
+    # longues que SLOW_QUERY_SECONDS (0 = désactivé). Sans METRICS_TOKEN,
+    # /metrics n’est ouvert qu’en local et aux administrateurs connectés
+    INSTRUMENTATION = os.getenv("INSTRUMENTATION", "1") == "1"
+    SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", 0))
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+    # 🌿 Mode asynchrone Socket.IO : threading (run.py) ou eventlet / gevent (serve.py)
+    SOCKETIO_ASYNC_MODE = os.getenv("SOCKETIO_ASYNC_MODE", "threading")
+    # Connexions simultanées maximales par worker (serve.py)
+    SERVER_MAX_CONNECTIONS = int(os.getenv("SERVER_MAX_CONNECTIONS", 10000))
+    # 👥 Arrivées / départs regroupés sur cette fenêtre (secondes) avant diffusion
+    PRESENCE_DEBOUNCE = float(os.getenv("PRESENCE_DEBOUNCE", 0.5))
+
+    # 🔀 Plusieurs workers Socket.IO derrière un même port
+    # File de messages partagée : local://127.0.0.1:5555 (broker intégré), redis://, amqp://...
+    SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+    WORKERS = int(os.getenv("WORKERS", 1))
+    # Sans sessions "collantes", le long-polling ne fonctionne pas entre workers
+    SOCKETIO_WEBSOCKET_ONLY = os.getenv("SOCKETIO_WEBSOCKET_ONLY", "1" if WORKERS > 1 else "0") == "1"
+    # 🗜️ Messages en codes courts pour les clients qui l’annoncent (app.wire)
+    SOCKETIO_COMPACT_EVENTS = os.getenv("SOCKETIO_COMPACT_EVENTS", "1") == "1"
+
+    # 🗜️ Compression HTTP (app.compression) : gzip, brotli si le module est installé
+    HTTP_COMPRESSION = os.getenv("HTTP_COMPRESSION", "1") == "1"
+    HTTP_COMPRESSION_MIN_SIZE = int(os.getenv("HTTP_COMPRESSION_MIN_SIZE", 512))
+    HTTP_GZIP_LEVEL = int(os.getenv("HTTP_GZIP_LEVEL", 6))
+    HTTP_BROTLI_QUALITY = int(os.getenv("HTTP_BROTLI_QUALITY", 5))
+
+    # ✍️ Écriture différée des messages (write-behind, un seul processus)
+    MESSAGE_WRITE_BEHIND = os.getenv("MESSAGE_WRITE_BEHIND", "0") == "1"
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 200))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", 0.05))
+    WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", 10000))
+    WRITE_BEHIND_PUT_TIMEOUT = float(os.getenv("WRITE_BEHIND_PUT_TIMEOUT", 1.0))
+    # Ids de messages réservés en base par blocs (séquence)
+    WRITE_BEHIND_ID_BLOCK = int(os.getenv("WRITE_BEHIND_ID_BLOCK", 100))
+    # Numéros de séquence par salon réservés de la même façon (app.sequences)
+    ROOM_SEQ_BLOCK = int(os.getenv("ROOM_SEQ_BLOCK", 100))
+
+    # 📥 Import de comptes en masse (app.user_import) : lignes par transaction
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+
+    # 🔐 Hachage des mots de passe (app.passwords) : méthode Werkzeug (les empreintes
+    # plus anciennes sont refaites à la connexion), processus de hachage par worker
+    # (0 = dans le thread de la requête), calculs en attente au-delà desquels la
+    # connexion est refusée (503) et délai maximal d’un calcul (s)
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    KDF_WORKERS = int(os.getenv("KDF_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+    KDF_QUEUE_LIMIT = int(os.getenv("KDF_QUEUE_LIMIT", 64))
+    KDF_TIMEOUT = float(os.getenv("KDF_TIMEOUT", 10))
+    # 🚦 Tentatives de connexion par adresse IP (chacune) et par compte (échecs) :
+    # rafale autorisée puis jetons par minute, 0 = sans limite. Derrière un proxy
+    # inverse, toutes les requêtes ont l’adresse du proxy : relever LOGIN_IP_*
+    LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", 20))
+    LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", 10))
+    LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", 5))
+    LOGIN_USER_PER_MINUTE = float(os.getenv("LOGIN_USER_PER_MINUTE", 2))
+
+    # 🗄️ Rétention (app.retention) : durée de conservation par défaut en jours
+    # (0 = illimitée, réglable par salon), taille des lots et période du passage (s)
+    MESSAGE_RETENTION_DAYS = int(os.getenv("MESSAGE_RETENTION_DAYS", 0))
+    RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 1000))
+    RETENTION_INTERVAL = int(os.getenv("RETENTION_INTERVAL", 3600))
+
+    # 📤 Export de l’historique (app.export) : messages lus par lot
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
     # 📁 Configuration pour l’upload
     UPLOAD_FOLDER = os.path.join(BASE_DIR, "app", "static", "uploads")
     ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "pdf"}
+    # Derrière nginx : préfixe d’une location "internal" pointant sur UPLOAD_FOLDER
+    # (ex. /_uploads/) ; les fichiers sont alors envoyés par nginx via X-Accel-Redirect
+    UPLOADS_ACCEL_REDIRECT = os.getenv("UPLOADS_ACCEL_REDIRECT") or None
+    # Envois par morceaux via Socket.IO : parties en cours, taille d’un morceau,
+    # taille maximale d’un fichier et durée de conservation d’un envoi abandonné (s)
+    UPLOAD_TMP_FOLDER = os.path.join(BASE_DIR, "instance", "uploads_tmp")
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 256 * 1024))
+    UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", MAX_CONTENT_LENGTH))
+    UPLOAD_TMP_TTL = int(os.getenv("UPLOAD_TMP_TTL", 24 * 3600))
+    # Fichiers rangés par empreinte : délai avant d’effacer un blob sans référence (s)
+    BLOB_GC_GRACE = int(os.getenv("BLOB_GC_GRACE", 600))
+    # Aperçus (miniatures d’images, 1re page des PDF) : côté max en pixels, threads de rendu
+    PREVIEW_SIZE = int(os.getenv("PREVIEW_SIZE", 400))
+    PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", 2))
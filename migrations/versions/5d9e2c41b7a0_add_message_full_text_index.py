@@ -0,0 +1,65 @@
+"""add full-text search index on message content
+
+Revision ID: 5d9e2c41b7a0
+Revises: 1eae68272332
+Create Date: 2026-10-18 12:02:41.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d9e2c41b7a0'
+down_revision = '1eae68272332'
+branch_labels = None
+depends_on = None
+
+
+# Copie figée des instructions de app/search.py à la date de cette révision
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5("
+    "content, room_id, user_id, content='message', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS message_fts_insert AFTER INSERT ON message BEGIN "
+    "INSERT INTO message_fts (rowid, content, room_id, user_id) "
+    "VALUES (new.id, new.content, new.room_id, new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS message_fts_delete AFTER DELETE ON message BEGIN "
+    "INSERT INTO message_fts (message_fts, rowid, content, room_id, user_id) "
+    "VALUES ('delete', old.id, old.content, old.room_id, old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS message_fts_update AFTER UPDATE OF content, room_id, user_id ON message BEGIN "
+    "INSERT INTO message_fts (message_fts, rowid, content, room_id, user_id) "
+    "VALUES ('delete', old.id, old.content, old.room_id, old.user_id); "
+    "INSERT INTO message_fts (rowid, content, room_id, user_id) "
+    "VALUES (new.id, new.content, new.room_id, new.user_id); END",
+    # Messages existants
+    "INSERT INTO message_fts (message_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS message_fts_update",
+    "DROP TRIGGER IF EXISTS message_fts_delete",
+    "DROP TRIGGER IF EXISTS message_fts_insert",
+    "DROP TABLE IF EXISTS message_fts",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(sa.text(statement))
+    elif dialect == 'postgresql':
+        op.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_message_content_fts ON message "
+            "USING gin (to_tsvector('simple', coalesce(content, '')))"
+        ))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(sa.text(statement))
+    elif dialect == 'postgresql':
+        op.execute(sa.text("DROP INDEX IF EXISTS ix_message_content_fts"))
@@ -0,0 +1,34 @@
+"""message ids never reused (SQLite AUTOINCREMENT) so id blocks can be reserved
+
+Revision ID: a7c3e9f2b614
+Revises: e41d6b0c27a8
+Create Date: 2026-10-18 16:02:44.918233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9f2b614'
+down_revision = 'e41d6b0c27a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite seulement : PostgreSQL dispose déjà de message_id_seq.
+    # La table est reconstruite ; sqlite_sequence repart du plus grand id existant.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    with op.batch_alter_table('message', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    with op.batch_alter_table('message', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
@@ -1,12 +1,31 @@
 from app import create_app, socketio
+from app.stats import start_reconciler
+from app.retention import start_retention
 import os
 
 app = create_app()
 
+
+def serve_worker(app, listener):
+    """Sert l’application sur un socket d’écoute hérité du processus parent"""
+    from werkzeug.serving import make_server
+    host, port = listener.getsockname()
+    make_server(host, port, app, threaded=True, fd=listener.fileno()).serve_forever()
+
+
 if __name__ == "__main__":
-    socketio.run(
-        app,
-        host="0.0.0.0",
-        port=int(os.environ.get("PORT", 5000)),
-        allow_unsafe_werkzeug=True
-    )
+    host = "0.0.0.0"
+    port = int(os.environ.get("PORT", 5000))
+
+    if app.config["WORKERS"] > 1 or app.config["SOCKETIO_MESSAGE_QUEUE"]:
+        from app.cluster import serve_cluster
+        serve_cluster(create_app, host, port, app.config["WORKERS"], serve_worker)
+    else:
+        start_reconciler(app)
+        start_retention(app)
+        socketio.run(
+            app,
+            host=host,
+            port=port,
+            allow_unsafe_werkzeug=True
+        )
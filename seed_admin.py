@@ -1,7 +1,10 @@
 from app import create_app, db
 from app.models import User
+from app.schema import init_db
 
 app = create_app()
+if init_db(app) == "created":
+    print("✔ Tables créées")
 with app.app_context():
     if not User.query.filter_by(username="admin").first():
         admin = User(username="admin", role="admin", active=True)
@@ -0,0 +1,56 @@
+"""Point d’entrée de production : serveur green-thread (eventlet par défaut, ou gevent).
+
+    python serve.py                          # un processus eventlet
+    WORKERS=4 SOCKETIO_MESSAGE_QUEUE=local://127.0.0.1:5555 python serve.py
+
+Le monkey-patching doit avoir lieu avant tout autre import.
+"""
+import os
+
+ASYNC_MODE = os.environ.setdefault("SOCKETIO_ASYNC_MODE", "eventlet")
+
+if ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+else:
+    raise SystemExit(f"serve.py attend SOCKETIO_ASYNC_MODE=eventlet ou gevent (reçu : {ASYNC_MODE})")
+
+from app import create_app  # noqa: E402
+from app.stats import start_reconciler  # noqa: E402
+from app.retention import start_retention  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def serve_worker(app, listener):
+    """Sert l’application sur un socket d’écoute (green) hérité du processus parent"""
+    max_connections = app.config["SERVER_MAX_CONNECTIONS"]
+    if ASYNC_MODE == "eventlet":
+        import eventlet.wsgi
+        eventlet.wsgi.server(listener, app, max_size=max_connections, log_output=False)
+    else:
+        from gevent.pool import Pool
+        from gevent.pywsgi import WSGIServer
+        WSGIServer(listener, app, spawn=Pool(max_connections), log=None).serve_forever()
+
+
+if __name__ == "__main__":
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = int(os.environ.get("PORT", 5000))
+
+    # En mode multi-workers, l’application est créée dans chaque worker après le fork
+    if Config.WORKERS > 1 or Config.SOCKETIO_MESSAGE_QUEUE:
+        from app.cluster import serve_cluster
+        serve_cluster(create_app, host, port, Config.WORKERS, serve_worker)
+    else:
+        app = create_app()
+        start_reconciler(app)
+        start_retention(app)
+        import socket
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, port))
+        listener.listen(1024)
+        serve_worker(app, listener)